@@ -0,0 +1,50 @@
+'''
+Compare the exact and approximate modes of pyslicer.markup.minimumCylinder_from_pointMarkup.
+
+Run it in the Slicer Python environment:
+
+    PythonSlicer examples/cylinder_benchmark/cylinder_benchmark.py
+'''
+
+import time
+
+import numpy as np
+
+from pyslicer.markup import minimumCylinder_from_pointMarkup
+
+
+def random_cylinder_points(n_points, radius=5, height=20, seed=0):
+    '''
+    Points filling a randomly oriented cylinder.
+    '''
+
+    rng = np.random.default_rng(seed)
+    angle = rng.uniform(0, 2 * np.pi, n_points)
+    r = radius * np.sqrt(rng.random(n_points))
+    z = rng.uniform(-height / 2, height / 2, n_points)
+    points = np.column_stack((r * np.cos(angle), r * np.sin(angle), z))
+
+    rotation, _ = np.linalg.qr(rng.normal(size=(3, 3)))
+
+    return points @ rotation.T
+
+
+def cylinder_volume(cylinder_dict):
+    return np.pi * cylinder_dict['radius'] ** 2 * cylinder_dict['height']
+
+
+if __name__ == '__main__':
+
+    print(f"{'points':>10} {'mode':>20} {'time [s]':>10} {'volume':>10}")
+
+    for n_points in (1_000, 10_000, 100_000, 1_000_000):
+        points = random_cylinder_points(n_points)
+
+        for label, kwargs in (('exact', {}),
+                              ('approximate 1e-2', {'approximate': True, 'tolerance': 1e-2}),
+                              ('approximate 1e-3', {'approximate': True, 'tolerance': 1e-3})):
+            start = time.perf_counter()
+            _, cylinder_dict = minimumCylinder_from_pointMarkup(points, create_model=False, **kwargs)
+            elapsed = time.perf_counter() - start
+
+            print(f"{n_points:>10} {label:>20} {elapsed:>10.3f} {cylinder_volume(cylinder_dict):>10.1f}")
@@ -0,0 +1,59 @@
+'''
+Check that pyslicer.model.shrink_or_swell_shapely_polygons matches the per-polygon shrink_or_swell_shapely_polygon
+loop, and compare their speed.
+
+Run it in the Slicer Python environment:
+
+    PythonSlicer examples/polygon_buffer_benchmark/polygon_buffer_benchmark.py
+'''
+
+import time
+
+import numpy as np
+from shapely.geometry import Polygon
+
+from pyslicer.model import shrink_or_swell_shapely_polygon, shrink_or_swell_shapely_polygons
+
+
+def random_polygons(n_polygons, seed=0):
+    '''
+    Random convex polygons of various sizes and positions.
+    '''
+
+    rng = np.random.default_rng(seed)
+    polygons = []
+    for i in range(n_polygons):
+        points = rng.random((8, 2)) * rng.uniform(1, 50) + rng.uniform(-100, 100, 2)
+        polygons.append(Polygon(points).convex_hull)
+
+    return polygons
+
+
+def check_equivalence(polygons, factor, swell, **kwargs):
+    '''
+    Same vertex counts and geometries, up to floating-point tolerance, as the per-polygon loop.
+    '''
+
+    batch = shrink_or_swell_shapely_polygons(polygons, factor=factor, swell=swell, **kwargs)
+    loop = [shrink_or_swell_shapely_polygon(polygon, factor=factor, swell=swell) for polygon in polygons]
+
+    for resized_batch, resized_loop in zip(batch, loop):
+        assert len(resized_batch.exterior.coords) == len(resized_loop.exterior.coords)
+        assert resized_batch.equals_exact(resized_loop, 1e-9)
+
+
+if __name__ == '__main__':
+
+    polygons = random_polygons(500)
+    for swell in (False, True):
+        check_equivalence(polygons, 0.1, swell)
+        check_equivalence(polygons, 0.2, swell, chunk_size=64, workers=4)
+    print('batch and per-polygon results match')
+
+    polygons = random_polygons(20_000)
+    for label, resize in (('loop', lambda: [shrink_or_swell_shapely_polygon(p, swell=True) for p in polygons]),
+                          ('batch', lambda: shrink_or_swell_shapely_polygons(polygons, swell=True)),
+                          ('batch 4 threads', lambda: shrink_or_swell_shapely_polygons(polygons, swell=True, chunk_size=2_000, workers=4))):
+        start = time.perf_counter()
+        resize()
+        print(f"{label:>16} {time.perf_counter() - start:>8.3f} s")
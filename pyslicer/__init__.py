@@ -1,10 +1,14 @@
 __version__='dev'
 
+import pyslicer.diskcache
+import pyslicer.histogram
 import pyslicer.labelmap
 import pyslicer.load
+import pyslicer.lod
 import pyslicer.markup
 import pyslicer.model
 import pyslicer.roi
 import pyslicer.segmentation
+import pyslicer.threshold
 import pyslicer.view
 import pyslicer.volume
\ No newline at end of file
@@ -0,0 +1,180 @@
+import slicer
+import os
+
+# Size limit of each cache folder; the least recently used files are evicted beyond it
+DISK_CACHE_MAX_BYTES = 2 * 2**30
+
+# Age (s) after which a temporary file being written is considered left over by a crashed writer
+_PARTIAL_FILE_TIMEOUT = 3600
+
+# Node removal and scene close callbacks of the in-memory caches, per cache name, see observe_scene()
+_scene_callbacks = {}
+
+# Scene observer tags installed by observe_scene()
+_scene_observers = []
+
+def cache_dir(name):
+    '''
+    Folder of a pyslicer on-disk cache, created if needed.
+
+    Args:
+        name (str): cache name, e.g. 'models' (```pyslicer.load.models()```) or 'lod' (```pyslicer.lod.build_lod()```)
+
+    Returns:
+        folder (str): 'pyslicer/<name>' in the Slicer cache folder
+    '''
+
+    folder = os.path.join(slicer.app.cachePath, 'pyslicer', name)
+    os.makedirs(folder, exist_ok=True)
+
+    return folder
+
+def clear_cache(name=None):
+    '''
+    Delete the files of a pyslicer on-disk cache, or of all of them.
+
+    Args:
+        name (str): cache name, e.g. 'models' or 'lod'. Default None clears all pyslicer caches.
+    '''
+
+    import shutil
+
+    folder = os.path.join(slicer.app.cachePath, 'pyslicer')
+    if name is not None:
+        folder = os.path.join(folder, name)
+    shutil.rmtree(folder, ignore_errors=True)
+
+def observe_scene(name, node_removed=None, scene_closed=None):
+    '''
+    Keep an in-memory cache in sync with the scene, so that it does not hold on to removed nodes.
+
+    The scene observers are installed once and call the callbacks of every registered cache.
+
+    Args:
+        name (str): cache name, e.g. 'lod' or 'histogram'. Registering a name again replaces its callbacks.
+        node_removed (callable): called with each node removed from the scene
+        scene_closed (callable): called without arguments once the scene is closed
+    '''
+
+    import logging
+    import vtk
+
+    _scene_callbacks[name] = (node_removed, scene_closed)
+    if _scene_observers:
+        return
+
+    def notify(index, *args):
+        for cache, callbacks in list(_scene_callbacks.items()):
+            if callbacks[index] is not None:
+                try:
+                    callbacks[index](*args)
+                except Exception:
+                    logging.exception(f"Scene callback of the {cache} cache failed")
+
+    @vtk.calldata_type(vtk.VTK_OBJECT)
+    def on_node_removed(caller, event, node):
+        notify(0, node)
+
+    def on_scene_closed(caller, event):
+        notify(1)
+
+    _scene_observers.append(slicer.mrmlScene.AddObserver(slicer.vtkMRMLScene.NodeRemovedEvent, on_node_removed))
+    _scene_observers.append(slicer.mrmlScene.AddObserver(slicer.vtkMRMLScene.EndCloseEvent, on_scene_closed))
+
+def prune_cache(folder, max_bytes=None):
+    '''
+    Delete the least recently used files of a cache folder until it is under the size limit.
+
+    Files being written by ```write_vtp()``` are skipped, unless they were left over by a writer that crashed.
+
+    Args:
+        folder (str): cache folder
+        max_bytes (int): size limit. Default None uses ```DISK_CACHE_MAX_BYTES```.
+    '''
+
+    if max_bytes is None:
+        max_bytes = DISK_CACHE_MAX_BYTES
+
+    import time
+
+    entries = []
+    for entry in os.scandir(folder):
+        if entry.is_file():
+            stat = entry.stat()
+            if entry.name.endswith('.part'):
+                if time.time() - stat.st_mtime > _PARTIAL_FILE_TIMEOUT:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+def read_vtp(filename):
+    '''
+    Read a cached .vtp file, marking it as recently used for ```prune_cache()```.
+
+    Args:
+        filename (str): .vtp file
+
+    Returns:
+        polydata (vtk.vtkPolyData)
+    '''
+
+    from vtk import vtkXMLPolyDataReader
+
+    reader = vtkXMLPolyDataReader()
+    reader.SetFileName(filename)
+    reader.Update()
+
+    try:
+        os.utime(filename)
+    except OSError:
+        pass
+
+    return reader.GetOutput()
+
+def write_vtp(polydata, filename):
+    '''
+    Write a polydata as a compressed binary .vtp file.
+
+    The file is written under a unique temporary name in the same folder then renamed, so that a concurrent reader
+    never sees a partial file and concurrent writers of the same file (threads or sessions) do not interfere.
+
+    Args:
+        polydata (vtk.vtkPolyData): mesh
+        filename (str): .vtp file
+    '''
+
+    import tempfile
+    from vtk import vtkXMLPolyDataWriter
+
+    descriptor, partial = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)),
+                                           prefix=os.path.basename(filename) + '.', suffix='.part')
+    os.close(descriptor)
+
+    try:
+        writer = vtkXMLPolyDataWriter()
+        writer.SetFileName(partial)
+        writer.SetInputData(polydata)
+        writer.SetDataModeToAppended()
+        writer.SetCompressorTypeToZLib()
+        if not writer.Write():
+            raise IOError(f"Could not write {filename}")
+        os.replace(partial, filename)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,217 @@
+import slicer
+import numpy as np
+
+# Integer ranges up to this many values are counted exactly with numpy.bincount
+MAX_BINCOUNT_RANGE = 2**16
+
+# Histograms per volume node ID: (image data MTime, {parameters: (counts, bin_edges)})
+# Entries are dropped when their node is removed or the scene is closed, see _on_node_removed() and _on_scene_closed()
+_histogram_cache = {}
+
+def array_histogram(array, bins=256, sample_size=None, sampling='strided', seed=0, slab_size=2**22):
+    '''
+    Histogram of an array, exact and fast for integer dtypes and optionally subsampled for huge arrays.
+
+    Integer arrays spanning at most ```MAX_BINCOUNT_RANGE``` values (e.g. uint8, uint16) are counted with numpy.bincount,
+    one pass without sorting, and the exact counts are then grouped into ```bins``` bins. The values are counted in slabs
+    of ```slab_size```, so that the index arrays numpy.bincount needs never exceed the slab (e.g. for int16 CT volumes).
+    Other arrays go through numpy.histogram, optionally on a subsample of about ```sample_size``` values.
+
+    Args:
+        array (numpy.ndarray): input array (memory-mapped arrays are supported)
+        bins (int): number of equal-width bins. None keeps one bin per integer value (integer arrays only).
+        sample_size (int): target number of sampled values. Default None uses all values.
+        sampling (str): 'strided' takes every n-th value (no copy of the array), 'random' draws values uniformly. Default 'strided'.
+        seed (int): seed of the random sampling. Default 0.
+        slab_size (int): number of integer values counted at once. Default 2**22.
+
+    Returns:
+        counts (numpy.ndarray), bin_edges (numpy.ndarray): as returned by numpy.histogram()
+    '''
+
+    values = np.ravel(array)
+
+    if sample_size is not None and sample_size < values.size:
+        if sampling == 'strided':
+            values = values[::int(np.ceil(values.size / sample_size))]
+        elif sampling == 'random':
+            rng = np.random.default_rng(seed)
+            values = values[np.sort(rng.integers(0, values.size, size=sample_size))]
+        else:
+            raise ValueError("sampling must be 'strided' or 'random'")
+
+    if values.dtype == bool:
+        values = values.view(np.uint8)
+
+    if np.issubdtype(values.dtype, np.integer):
+        vmin, vmax = int(values.min()), int(values.max())
+        if vmax - vmin < MAX_BINCOUNT_RANGE and vmax <= np.iinfo(np.intp).max:
+            # numpy.bincount converts its input to intp: offset and count slab by slab to bound that copy
+            exact_counts = np.zeros(vmax - vmin + 1, dtype=np.intp)
+            for start in range(0, values.size, slab_size):
+                offsets = np.subtract(values[start:start + slab_size], vmin, dtype=np.intp, casting='unsafe')
+                exact_counts += np.bincount(offsets, minlength=exact_counts.size)
+            if bins is None:
+                return exact_counts, np.arange(vmin, vmax + 2) - 0.5
+            # Group the exact integer counts: no value is visited again
+            return np.histogram(np.arange(vmin, vmax + 1), bins=bins, range=(vmin - 0.5, vmax + 0.5), weights=exact_counts)
+
+    if bins is None:
+        raise ValueError("bins=None is only supported for integer arrays spanning at most MAX_BINCOUNT_RANGE values")
+
+    if np.issubdtype(values.dtype, np.floating):
+        values = values[np.isfinite(values)]
+
+    return np.histogram(values, bins=bins)
+
+def array_percentiles(array, percentiles, bins=4096, slab_size=2**22, refine=True):
+    '''
+    Approximate percentiles of a huge array with bounded memory, without sorting it.
+
+    The array is streamed in slabs along its first axis (memory-mapped arrays are read sequentially) and the
+    percentiles are located in a fixed-size histogram. Integer arrays spanning at most ```MAX_BINCOUNT_RANGE``` values
+    are counted exactly, so the error is below one intensity step. For other arrays the error is below one bin width,
+    (max - min) / bins, and ```refine``` re-reads the slabs once to histogram only the bins holding the percentiles,
+    reducing the error to (max - min) / bins**2.
+
+    Args:
+        array (numpy.ndarray): input array
+        percentiles (float or list): percentiles to compute, between 0 and 100 (as numpy.percentile)
+        bins (int): number of histogram bins. Default 4096.
+        slab_size (int): approximate number of values read at once. Default 2**22.
+        refine (bool): extra pass refining the bins holding the percentiles (non-integer arrays only). Default True.
+
+    Returns:
+        values (numpy.ndarray): approximate value of each percentile
+    '''
+
+    quantiles = np.atleast_1d(np.asarray(percentiles, dtype=float)) / 100
+    if np.any((quantiles < 0) | (quantiles > 1)):
+        raise ValueError("percentiles must be between 0 and 100")
+
+    if not isinstance(array, np.ndarray):
+        array = np.asarray(array)
+    if array.ndim == 0:
+        array = array.reshape(1)
+    rows = max(1, slab_size // max(1, int(np.prod(array.shape[1:]))))
+
+    def slabs():
+        for start in range(0, array.shape[0], rows):
+            slab = np.ravel(array[start:start + rows])
+            if np.issubdtype(slab.dtype, np.floating):
+                slab = slab[np.isfinite(slab)]
+            if slab.dtype == bool:
+                slab = slab.view(np.uint8)
+            yield slab
+
+    # First pass: value range
+    vmin, vmax, total = np.inf, -np.inf, 0
+    for slab in slabs():
+        if slab.size:
+            vmin, vmax, total = min(vmin, slab.min()), max(vmax, slab.max()), total + slab.size
+    if total == 0:
+        raise ValueError("array has no finite values")
+
+    ranks = quantiles * (total - 1)
+
+    integer = np.issubdtype(np.asarray(vmin).dtype, np.integer) and int(vmax) - int(vmin) < MAX_BINCOUNT_RANGE
+    if integer:
+        vmin, vmax = int(vmin), int(vmax)
+        counts = np.zeros(vmax - vmin + 1, dtype=np.int64)
+        for slab in slabs():
+            counts += np.bincount(slab.astype(np.intp) - vmin, minlength=counts.size)
+        return vmin + np.searchsorted(np.cumsum(counts), ranks, side='right').astype(float)
+
+    vmin, vmax = float(vmin), float(vmax)
+    if vmin == vmax:
+        return np.full(quantiles.shape, vmin)
+
+    # Second pass: coarse histogram
+    counts = np.zeros(bins, dtype=np.int64)
+    for slab in slabs():
+        counts += np.histogram(slab, bins=bins, range=(vmin, vmax))[0]
+    edges = np.linspace(vmin, vmax, bins + 1)
+    cdf = np.cumsum(counts)
+    idx = np.minimum(np.searchsorted(cdf, ranks, side='right'), bins - 1)
+    before = np.where(idx > 0, cdf[idx - 1], 0)
+
+    if not refine:
+        # Linear interpolation inside the bin
+        return edges[idx] + (ranks - before + 0.5) / counts[idx] * (edges[idx + 1] - edges[idx])
+
+    # Third pass: fine histogram of the bins holding the percentiles only
+    unique_idx = np.unique(idx)
+    fine_counts = {k: np.zeros(bins, dtype=np.int64) for k in unique_idx}
+    for slab in slabs():
+        slab_idx = np.clip(((slab - vmin) / (vmax - vmin) * bins).astype(np.intp), 0, bins - 1)
+        for k in unique_idx:
+            fine_counts[k] += np.histogram(slab[slab_idx == k], bins=bins, range=(edges[k], edges[k + 1]))[0]
+
+    values = np.empty(quantiles.shape)
+    for i, (k, rank) in enumerate(zip(idx, ranks - before)):
+        fine_cdf = np.cumsum(fine_counts[k])
+        j = min(np.searchsorted(fine_cdf, rank, side='right'), bins - 1)
+        fine_width = (edges[k + 1] - edges[k]) / bins
+        values[i] = edges[k] + (j + 0.5) * fine_width
+
+    # The extreme percentiles are known exactly from the first pass
+    values[quantiles == 0] = vmin
+    values[quantiles == 1] = vmax
+
+    return values
+
+def clear_cache(volumeNode=None):
+    '''
+    Drop the cached histograms of a volume node, or of all volume nodes.
+
+    Args:
+        volumeNode (slicer.vtkMRMLVolumeNode): Volume Node. Default None clears the whole cache.
+    '''
+
+    if volumeNode is None:
+        _histogram_cache.clear()
+    else:
+        _histogram_cache.pop(volumeNode.GetID(), None)
+
+def volume_histogram(volumeNode, bins=256, sample_size=None, sampling='strided', seed=0):
+    '''
+    Histogram of the voxel intensities of a volume, cached until the image data is modified.
+
+    The cache is keyed by the modified time of the node's image data, so plotting again with new threshold lines
+    or evaluating several threshold methods does not visit the voxels again. The histograms of a node are dropped when
+    it is removed from the scene or the scene is closed.
+    Note that changes made in place through ```slicer.util.arrayFromVolume()``` are only detected
+    after calling ```slicer.util.arrayFromVolumeModified()```.
+
+    Args:
+        volumeNode (slicer.vtkMRMLVolumeNode): Volume Node
+        bins (int): number of equal-width bins. None keeps one bin per integer value (integer volumes only).
+        sample_size (int): target number of sampled voxels. Default None uses all voxels.
+        sampling (str): 'strided' or 'random' voxel sampling, see ```array_histogram()```. Default 'strided'.
+        seed (int): seed of the random sampling. Default 0.
+
+    Returns:
+        counts (numpy.ndarray), bin_edges (numpy.ndarray): as returned by numpy.histogram()
+    '''
+
+    mtime = volumeNode.GetImageData().GetMTime()
+    params = (bins, sample_size, sampling, seed)
+
+    cached_mtime, histograms = _histogram_cache.get(volumeNode.GetID(), (None, {}))
+    if cached_mtime != mtime:
+        from pyslicer.diskcache import observe_scene
+        observe_scene('histogram', _on_node_removed, _on_scene_closed)
+        histograms = {}
+        _histogram_cache[volumeNode.GetID()] = (mtime, histograms)
+
+    if params not in histograms:
+        volumeArray = slicer.util.arrayFromVolume(volumeNode)
+        histograms[params] = array_histogram(volumeArray, bins=bins, sample_size=sample_size, sampling=sampling, seed=seed)
+
+    return histograms[params]
+
+def _on_node_removed(node):
+    _histogram_cache.pop(node.GetID(), None)
+
+def _on_scene_closed():
+    _histogram_cache.clear()
@@ -74,6 +74,159 @@ def model(model_file, name = None, color=None):
 
     return modelNode
 
+def models(model_files, workers=4, names=None, color=None, cache_dir=None, coordinateSystem=None):
+    '''
+    Load many model files (e.g. .vtk, .stl, .obj, .ply) in Slicer, parsing them concurrently.
+
+    The files are parsed with VTK readers in a pool of ```workers``` threads and the model nodes are added to the scene
+    on the main thread, in the order of ```model_files```. As ```slicer.util.loadModel()```, the coordinate system is read
+    from the file header ('SPACE=RAS' or 'SPACE=LPS', or the 'SPACE' field data array of .vtp files) and defaults to LPS.
+    The parsed meshes are cached in RAS as compressed .vtp files keyed by path, size, modification time and coordinate system,
+    so that opening the same files again skips the parsing. The cache is limited to ```pyslicer.diskcache.DISK_CACHE_MAX_BYTES```
+    (least recently used files are evicted) and can be cleared with ```pyslicer.diskcache.clear_cache('models')```.
+    Files without a matching VTK reader are loaded with ```slicer.util.loadModel()```.
+
+    Args:
+        model_files (list): File paths of the models to load
+        workers (int): number of parsing threads. Default is 4.
+        names (list): names of the Model Nodes. By default, the file names without extension.
+        color (tuple): Display color of the Model Nodes. Insert the 3 RGB values in scale 0-1.
+        cache_dir (str): folder of the cached meshes. Default is 'pyslicer/models' in the Slicer cache folder. False disables the cache.
+        coordinateSystem (str): 'RAS' or 'LPS' coordinate system of all files, overriding their headers. Default None reads the headers.
+
+    Returns:
+        modelNodes (list): model nodes
+    '''
+
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+    from pyslicer.diskcache import cache_dir as default_cache_dir, prune_cache
+
+    if coordinateSystem not in (None, 'RAS', 'LPS'):
+        raise ValueError("coordinateSystem must be None, 'RAS' or 'LPS'")
+
+    model_files = [str(model_file) for model_file in model_files]
+    if names is None:
+        names = [Path(model_file).stem for model_file in model_files]
+
+    if cache_dir is None:
+        cache_dir = default_cache_dir('models')
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    modelNodes = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        polydatas = executor.map(lambda model_file: _read_model_file(model_file, cache_dir, coordinateSystem), model_files)
+
+        for model_file, name, polydata in zip(model_files, names, polydatas):
+            if polydata is None:
+                properties = {} if coordinateSystem is None else {'coordinateSystem': slicer.vtkMRMLStorageNode.GetCoordinateSystemTypeFromString(coordinateSystem)}
+                modelNode = slicer.util.loadModel(model_file, properties=properties)
+            else:
+                modelNode = slicer.modules.models.logic().AddModel(polydata)
+            modelNode.SetName(name)
+
+            if color:
+                modelNode.GetDisplayNode().SetColor(color)
+
+            modelNodes.append(modelNode)
+
+    if cache_dir:
+        prune_cache(cache_dir)
+
+    return modelNodes
+
+def _coordinate_system(reader, polydata):
+    '''
+    Coordinate system ('RAS' or 'LPS') declared in a parsed model file, as read by the Slicer model storage node. None if not declared.
+    '''
+
+    # XML files (.vtp) store it as a field data string array
+    space = polydata.GetFieldData().GetAbstractArray('SPACE')
+    if space is not None and space.IsA('vtkStringArray') and space.GetNumberOfValues() > 0:
+        value = space.GetValue(0).upper()
+        if value in ('RAS', 'LPS'):
+            return value
+
+    # Legacy .vtk and .stl headers, .obj and .ply comments
+    header = ''
+    for getter in ('GetHeader', 'GetComment'):
+        if hasattr(reader, getter):
+            header += str(getattr(reader, getter)() or '')
+    if hasattr(reader, 'GetComments'):
+        comments = reader.GetComments()
+        header += ' '.join(comments.GetValue(i) for i in range(comments.GetNumberOfValues()))
+
+    header = header.upper()
+    for value in ('RAS', 'LPS'):
+        if f'SPACE={value}' in header:
+            return value
+
+    return None
+
+def _read_model_file(model_file, cache_dir, coordinateSystem=None):
+    '''
+    Parse a model file into a vtkPolyData in RAS coordinates, through the on-disk cache. None if there is no VTK reader for it.
+    '''
+
+    import os
+    import hashlib
+    import vtk
+    from pyslicer.diskcache import read_vtp, write_vtp
+
+    readers = {
+        '.g': vtk.vtkBYUReader,
+        '.obj': vtk.vtkOBJReader,
+        '.ply': vtk.vtkPLYReader,
+        '.stl': vtk.vtkSTLReader,
+        '.vtk': vtk.vtkPolyDataReader,
+        '.vtp': vtk.vtkXMLPolyDataReader,
+    }
+    extension = Path(model_file).suffix.lower()
+    if extension not in readers:
+        return None
+
+    cache_file = None
+    if cache_dir:
+        stat = os.stat(model_file)
+        key = hashlib.sha1(f"{os.path.abspath(model_file)}|{stat.st_size}|{stat.st_mtime_ns}|{coordinateSystem}".encode()).hexdigest()
+        cache_file = os.path.join(cache_dir, key + '.vtp')
+        if os.path.exists(cache_file):
+            return read_vtp(cache_file)
+
+    reader = readers[extension]()
+    reader.SetFileName(model_file)
+    reader.Update()
+    polydata = reader.GetOutput()
+
+    if polydata.GetNumberOfPoints() == 0:
+        # e.g. a legacy .vtk file holding an unstructured grid
+        return None
+
+    # Same coordinate system convention as the Slicer model storage node: LPS unless declared otherwise
+    if coordinateSystem is None:
+        coordinateSystem = _coordinate_system(reader, polydata) or 'LPS'
+    if coordinateSystem == 'LPS':
+        lpsToRas = vtk.vtkTransform()
+        lpsToRas.Scale(-1, -1, 1)
+        transformFilter = vtk.vtkTransformPolyDataFilter()
+        transformFilter.SetTransform(lpsToRas)
+        transformFilter.SetInputData(polydata)
+        transformFilter.Update()
+        polydata = transformFilter.GetOutput()
+
+    # The cached mesh is in RAS
+    space = vtk.vtkStringArray()
+    space.SetName('SPACE')
+    space.InsertNextValue('RAS')
+    polydata.GetFieldData().RemoveArray('SPACE')
+    polydata.GetFieldData().AddArray(space)
+
+    if cache_file:
+        write_vtp(polydata, cache_file)
+
+    return polydata
+
 def zstack(zstack_file, spacing=None, channel='Channel:0:0', color='grey'):
     '''
     Load .czi z-stack images in Slicer. 
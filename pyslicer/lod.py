@@ -0,0 +1,297 @@
+import slicer
+import numpy as np
+import os
+from contextlib import contextmanager
+
+# Default fractions of triangles removed at each coarser level of a pyramid
+LOD_REDUCTION_FACTORS = (0.5, 0.8, 0.95)
+
+# Level-of-detail pyramids per model node ID: {'levels': [vtkPolyData], 'triangles': [int], 'level': int, 'address': str}
+# Entries are dropped when their node is removed or the scene is closed, see _on_node_removed() and _on_scene_closed()
+_lod_pyramids = {}
+
+# Camera observer installed by enable_auto_lod(): {'cameraNode', 'tag', 'kwargs'}
+_auto_lod = {}
+
+# Nesting depth of full_resolution(), which suspends the automatic switching
+_lod_suspended = [0]
+
+def build_lod(modelNodes, reductionFactors=LOD_REDUCTION_FACTORS, cache_dir=None):
+    '''
+    Generate a pyramid of decimated levels for each model, cached on disk.
+
+    Level 0 is the model's own polydata, level i is decimated with ```pyslicer.model.decimate_polydata()```
+    (the in-process path of ```pyslicer.model.decimate_model()```) so that ```reductionFactors[i-1]``` of the triangles
+    are removed. Each level is decimated from the previous one, and the levels are stored as compressed .vtp files
+    named after a hash of the full resolution mesh, so they are only computed once across sessions.
+
+    Args:
+        modelNodes (MRMLCore.vtkMRMLModelNode or list): model node(s)
+        reductionFactors (tuple): increasing fractions of triangles removed at each level. Default is (0.5, 0.8, 0.95)
+        cache_dir (str): folder of the cached levels. Default is 'pyslicer/lod' in the Slicer cache folder, limited to
+            ```pyslicer.diskcache.DISK_CACHE_MAX_BYTES``` and cleared with ```pyslicer.diskcache.clear_cache('lod')```
+
+    Returns:
+        triangles (dict): number of triangles of each level, per model name
+    '''
+
+    from pyslicer.diskcache import cache_dir as default_cache_dir, observe_scene, prune_cache, read_vtp, write_vtp
+    from pyslicer.model import decimate_polydata
+
+    if not isinstance(modelNodes, (list, tuple)):
+        modelNodes = [modelNodes]
+
+    if cache_dir is None:
+        cache_dir = default_cache_dir('lod')
+    os.makedirs(cache_dir, exist_ok=True)
+
+    observe_scene('lod', _on_node_removed, _on_scene_closed)
+
+    triangles = {}
+    for modelNode in modelNodes:
+        full = _full_polydata(modelNode)
+        key = _polydata_hash(full)
+
+        levels = [full]
+        for i, factor in enumerate(reductionFactors):
+            filename = os.path.join(cache_dir, f"{key}_{factor:g}.vtp")
+            if os.path.exists(filename):
+                level = read_vtp(filename)
+            else:
+                # Reduction relative to the previous level giving the requested overall reduction
+                previous = reductionFactors[i - 1] if i > 0 else 0
+                level = decimate_polydata(levels[-1], 1 - (1 - factor) / (1 - previous))
+                write_vtp(level, filename)
+            levels.append(level)
+
+        pyramid = _pyramid(modelNode)
+        _lod_pyramids[modelNode.GetID()] = {
+            'levels': levels,
+            'triangles': [level.GetNumberOfCells() for level in levels],
+            'level': pyramid['level'] if pyramid else 0,
+            'address': modelNode.GetAddressAsString('vtkObject'),
+        }
+        triangles[modelNode.GetName()] = _lod_pyramids[modelNode.GetID()]['triangles']
+
+    prune_cache(cache_dir)
+
+    return triangles
+
+def clear_lod(modelNodes=None):
+    '''
+    Restore the full resolution and forget the pyramids of some models, or of all models.
+
+    Args:
+        modelNodes (MRMLCore.vtkMRMLModelNode or list): model node(s). Default None clears all pyramids.
+    '''
+
+    if modelNodes is None:
+        nodeIDs = list(_lod_pyramids)
+    elif isinstance(modelNodes, (list, tuple)):
+        nodeIDs = [modelNode.GetID() for modelNode in modelNodes]
+    else:
+        nodeIDs = [modelNodes.GetID()]
+
+    for nodeID in nodeIDs:
+        modelNode = slicer.mrmlScene.GetNodeByID(nodeID)
+        if modelNode is not None and _pyramid(modelNode) is not None:
+            set_lod_level(modelNode, 0)
+        _lod_pyramids.pop(nodeID, None)
+
+def disable_auto_lod(restore=True):
+    '''
+    Stop the automatic level switching started by ```enable_auto_lod()```.
+
+    Args:
+        restore (bool): display all models at full resolution again. Default is True
+    '''
+
+    if _auto_lod:
+        _auto_lod['cameraNode'].RemoveObserver(_auto_lod['tag'])
+        _auto_lod.clear()
+
+    if restore:
+        for modelNode, _ in _pyramid_nodes():
+            set_lod_level(modelNode, 0)
+
+def enable_auto_lod(triangle_budget=2_000_000, distances=None):
+    '''
+    Switch the displayed levels automatically with ```update_lod()``` whenever the 3D view camera moves.
+
+    Args:
+        triangle_budget (int): maximum number of displayed triangles. Default is 2 000 000
+        distances (list): increasing camera distances, relative to the model radius, switching to each coarser level.
+            Used instead of the triangle budget if given.
+    '''
+
+    from vtk import vtkCommand
+
+    disable_auto_lod(restore=False)
+
+    cameraNode = _camera_node()
+    kwargs = {'triangle_budget': triangle_budget, 'distances': distances}
+
+    def on_camera_modified(caller, event):
+        if not _lod_suspended[0]:
+            update_lod(**kwargs)
+
+    _auto_lod['cameraNode'] = cameraNode
+    _auto_lod['tag'] = cameraNode.AddObserver(vtkCommand.ModifiedEvent, on_camera_modified)
+    _auto_lod['kwargs'] = kwargs
+
+    update_lod(**kwargs)
+
+@contextmanager
+def full_resolution():
+    '''
+    Context manager displaying every model at full resolution, e.g. for screenshots and videos.
+
+    The automatic switching is suspended inside the block and the previous levels are restored on exit.
+
+    Example usage:
+        with full_resolution():
+            screenshot_3Dview('figure.png')
+    '''
+
+    previous = {modelNode.GetID(): pyramid['level'] for modelNode, pyramid in _pyramid_nodes()}
+    _lod_suspended[0] += 1
+    try:
+        for modelNode, _ in _pyramid_nodes():
+            set_lod_level(modelNode, 0)
+        yield
+    finally:
+        _lod_suspended[0] -= 1
+        for modelNode, _ in _pyramid_nodes():
+            if modelNode.GetID() in previous:
+                set_lod_level(modelNode, previous[modelNode.GetID()])
+
+def set_lod_level(modelNode, level):
+    '''
+    Display a level of the pyramid built by ```build_lod()```.
+
+    Note that the model node holds the displayed level, so restore the full resolution (level 0) before saving it.
+
+    Args:
+        modelNode (MRMLCore.vtkMRMLModelNode): model node
+        level (int): pyramid level, 0 is the full resolution
+    '''
+
+    pyramid = _pyramid(modelNode)
+    if pyramid is None:
+        raise ValueError(f"{modelNode.GetName()} has no level-of-detail pyramid, see build_lod()")
+    level = int(np.clip(level, 0, len(pyramid['levels']) - 1))
+
+    if pyramid['level'] != level:
+        pyramid['level'] = level
+        modelNode.SetAndObservePolyData(pyramid['levels'][level])
+
+def update_lod(triangle_budget=2_000_000, distances=None):
+    '''
+    Choose the displayed level of every visible model with a pyramid from the 3D view camera.
+
+    With a triangle budget, models start at their coarsest level and are refined by decreasing apparent size
+    (model radius over camera distance), each to the finest level keeping the total under the budget.
+    With ```distances```, each model independently switches to level i once the camera is farther than
+    ```distances[i-1]``` times its radius.
+
+    Args:
+        triangle_budget (int): maximum number of displayed triangles. Default is 2 000 000
+        distances (list): increasing camera distances, relative to the model radius, switching to each coarser level.
+            Used instead of the triangle budget if given.
+
+    Returns:
+        levels (dict): displayed level per model name
+    '''
+
+    camera_position = np.array(_camera_node().GetPosition())
+
+    models, sizes = [], []
+    for modelNode, pyramid in _pyramid_nodes():
+        if modelNode.GetDisplayNode() is None or not modelNode.GetDisplayNode().GetVisibility():
+            continue
+        bounds = np.zeros(6)
+        modelNode.GetRASBounds(bounds)
+        center, radius = bounds.reshape(3, 2).mean(axis=1), np.linalg.norm(np.diff(bounds.reshape(3, 2))) / 2
+        distance = max(np.linalg.norm(camera_position - center), 1e-6)
+        models.append((modelNode, pyramid, distance / max(radius, 1e-6)))
+        sizes.append(radius / distance)
+
+    levels = {}
+    if distances is not None:
+        for modelNode, pyramid, relative_distance in models:
+            levels[modelNode.GetID()] = int(np.searchsorted(distances, relative_distance, side='right'))
+    else:
+        levels = {modelNode.GetID(): len(pyramid['levels']) - 1 for modelNode, pyramid, _ in models}
+        total = sum(pyramid['triangles'][-1] for _, pyramid, _ in models)
+        for index in np.argsort(sizes)[::-1]:
+            modelNode, pyramid, _ = models[index]
+            coarsest = pyramid['triangles'][-1]
+            for level, count in enumerate(pyramid['triangles']):
+                if total - coarsest + count <= triangle_budget:
+                    levels[modelNode.GetID()] = level
+                    total += count - coarsest
+                    break
+
+    for modelNode, _, _ in models:
+        set_lod_level(modelNode, levels[modelNode.GetID()])
+
+    return {modelNode.GetName(): _lod_pyramids[modelNode.GetID()]['level'] for modelNode, _, _ in models}
+
+def _camera_node():
+    view = slicer.app.layoutManager().threeDWidget(0).threeDView()
+    return slicer.modules.cameras.logic().GetViewActiveCameraNode(view.mrmlViewNode())
+
+def _full_polydata(modelNode):
+    pyramid = _pyramid(modelNode)
+    return pyramid['levels'][0] if pyramid else modelNode.GetPolyData()
+
+def _on_node_removed(node):
+    # Only the pyramid built for this node, not one of a newer node with the same ID
+    pyramid = _lod_pyramids.get(node.GetID())
+    if pyramid is not None and pyramid['address'] == node.GetAddressAsString('vtkObject'):
+        del _lod_pyramids[node.GetID()]
+
+def _on_scene_closed():
+    _lod_pyramids.clear()
+    disable_auto_lod(restore=False)
+
+def _pyramid(modelNode):
+    '''
+    Pyramid of a model node, None if it has none or if the stored one belongs to another node that had the same ID.
+    '''
+
+    pyramid = _lod_pyramids.get(modelNode.GetID())
+    if pyramid is not None and pyramid['address'] != modelNode.GetAddressAsString('vtkObject'):
+        del _lod_pyramids[modelNode.GetID()]
+        return None
+
+    return pyramid
+
+def _pyramid_nodes():
+    '''
+    (model node, pyramid) of the pyramids whose node is still in the scene; stale entries are dropped.
+    '''
+
+    nodes = []
+    for nodeID in list(_lod_pyramids):
+        modelNode = slicer.mrmlScene.GetNodeByID(nodeID)
+        if modelNode is None:
+            del _lod_pyramids[nodeID]
+            continue
+        pyramid = _pyramid(modelNode)
+        if pyramid is not None:
+            nodes.append((modelNode, pyramid))
+
+    return nodes
+
+def _polydata_hash(polydata):
+    import hashlib
+    from vtk.util.numpy_support import vtk_to_numpy
+
+    sha = hashlib.sha1()
+    sha.update(np.ascontiguousarray(vtk_to_numpy(polydata.GetPoints().GetData())).tobytes())
+    for cells in (polydata.GetPolys(), polydata.GetStrips()):
+        if cells.GetNumberOfCells():
+            sha.update(np.ascontiguousarray(vtk_to_numpy(cells.GetData())).tobytes())
+
+    return sha.hexdigest()
@@ -1,82 +1,280 @@
 import slicer
+import numpy as np
+from collections import OrderedDict, namedtuple
+from functools import cached_property
 
-def fitPlane_from_pointMarkup(pointNodename = 'F',namePlane = 'Fitting Plane', slicerTransform = True):
+# Geometries of the most recently used point sets, see point_geometry()
+GEOMETRY_CACHE_SIZE = 8
+_geometry_cache = OrderedDict()
 
-    # from trimesh.points import PointCloud, plane_fit
-    from pyvista import Plane, fit_plane_to_points
-    from trimesh import Trimesh
-    from trimesh.bounds import oriented_bounds
-    from trimesh.transformations import inverse_matrix
-    
-    df_points = points_from_markup(pointNodename)
-       
-    fitted_plane, plane_origin, plane_normal = fit_plane_to_points(df_points.to_numpy(), return_meta = True)
-    
-    # pyvista PolyData to trimesh object
-    triangle_polydata = fitted_plane.extract_surface().triangulate()
-    faces_as_array = triangle_polydata.faces.reshape((triangle_polydata.n_cells, 4))[:, 1:] 
-    tmesh = Trimesh(triangle_polydata.points, faces_as_array) 
-    
-    transform, _ = oriented_bounds(tmesh)
-
-    if slicerTransform:
-        # Convert to a Slicer-friendly transform (change of axis order from pyvista/VTK objects to Slicer
-        transform = inverse_matrix(transform)
-        first_column = transform[:,0].copy()
-        third_column = transform[:,2].copy()
-        transform[:,0] = third_column
-        transform[:,2] = first_column
-    
-    plane_dict = {'origin' : plane_origin,
-                  'normal' : plane_normal,
-                  'transform' : transform}
-    
-    # fitted_plane = Plane(center=plane_origin, direction=plane_normal, i_size=i_size, j_size=j_size)
-    
-    planeNode = slicer.modules.models.logic().AddModel(fitted_plane)
-    planeNode.SetName(namePlane)
+# Maximum number of point-to-hypothesis residuals computed at once by the RANSAC fits, which bounds their memory
+RANSAC_MAX_RESIDUALS = 2**22
 
-    return planeNode, plane_dict
+# Voronoi diagram derived from a Delaunay triangulation, with the scipy.spatial.Voronoi attribute names
+VoronoiDiagram = namedtuple('VoronoiDiagram', ['vertices', 'ridge_vertices', 'ridge_points'])
+
+def approximate_minimum_cylinder(points, tolerance = 1e-3):
+    '''
+    Approximate minimum volume cylinder enclosing a point cloud.
+
+    The points are first reduced to their convex hull vertices (the enclosing cylinder only depends on them).
+    The axis direction is then optimized (Nelder-Mead, stopped at ```tolerance```) starting from each principal axis
+    of the hull, where each candidate axis is evaluated with the minimum enclosing circle of the projected points.
+
+    Args:
+        points (numpy.ndarray): (N, 3) points
+        tolerance (float): angle tolerance (radians) on the axis direction. Default 1e-3.
+
+    Returns:
+        cylinder_dict (dict): 'radius', 'height' and 'transform' (4x4, z along the axis, origin at the center) 
+            as ```trimesh.bounds.minimum_cylinder```
+    '''
+
+    from scipy.optimize import minimize
+    from scipy.spatial import ConvexHull
+    from trimesh.nsphere import minimum_nsphere
+
+    points = np.asarray(points, dtype=float)
+    try:
+        hull_points = points[ConvexHull(points).vertices]
+    except Exception:
+        # Flat or degenerate point cloud
+        hull_points = points
+
+    def frame(angles):
+        theta, phi = angles
+        direction = np.array([np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)])
+        helper = [1.0, 0, 0] if abs(direction[0]) < 0.9 else [0, 1.0, 0]
+        u = np.cross(direction, helper)
+        u /= np.linalg.norm(u)
+        return direction, u, np.cross(direction, u)
+
+    def cylinder(angles):
+        direction, u, v = frame(angles)
+        center_2d, radius = minimum_nsphere(hull_points @ np.stack((u, v)).T)
+        along = hull_points @ direction
+        return radius, np.ptp(along), center_2d, along
+
+    def volume(angles):
+        radius, height, _, _ = cylinder(angles)
+        return np.pi * radius ** 2 * height
+
+    _, _, principal_axes = np.linalg.svd(hull_points - hull_points.mean(axis=0), full_matrices=False)
+
+    best = None
+    for axis in principal_axes:
+        axis = axis if axis[2] >= 0 else -axis
+        x0 = [np.arccos(np.clip(axis[2], -1, 1)), np.arctan2(axis[1], axis[0])]
+        result = minimize(volume, x0, method='Nelder-Mead', 
+                          options={'xatol': tolerance, 'fatol': tolerance * volume(x0)})
+        if best is None or result.fun < best.fun:
+            best = result
+
+    radius, height, center_2d, along = cylinder(best.x)
+    direction, u, v = frame(best.x)
+
+    transform = np.eye(4)
+    transform[:3, 0] = u
+    transform[:3, 1] = v
+    transform[:3, 2] = direction
+    transform[:3, 3] = center_2d[0] * u + center_2d[1] * v + direction * (along.min() + along.max()) / 2
+
+    return {'radius' : float(radius),
+            'height' : float(height),
+            'transform' : transform}
+
+def fitPlane_from_pointMarkup(pointNodename = 'F',namePlane = 'Fitting Plane', slicerTransform = True, create_model = True):
+    '''
+    Fit a plane to the points of one or many Point List Nodes, see ```fit_planes()```.
+
+    Args:
+        pointNodename (str or list): Name of the markup node containing the point list, or list of names. Default "F"
+        namePlane (str or list): Name of the plane model node, or list of names. Default "Fitting Plane"
+        slicerTransform (bool): Return the plane-to-world transform (Slicer convention) instead of the world-to-plane one. Default True.
+        create_model (bool): Add a plane model node to the scene. Default True.
+
+    Returns:
+        planeNode (MRMLCore.vtkMRMLModelNode or None), plane_dict (dict): plane model node and plane parameters, or lists of them for a list of names
+    '''
+
+    batch = isinstance(pointNodename, (list, tuple))
+    nodenames = list(pointNodename) if batch else [pointNodename]
+    if isinstance(namePlane, str):
+        namePlane = [namePlane] if not batch else [f'{namePlane} {i}' for i in range(len(nodenames))]
+
+    plane_dicts = fit_planes(nodenames, slicerTransform=slicerTransform)
+
+    planeNodes = []
+    for plane_dict, name in zip(plane_dicts, namePlane):
+        planeNodes.append(_plane_model(plane_dict, name) if create_model else None)
+
+    if batch:
+        return planeNodes, plane_dicts
+
+    return planeNodes[0], plane_dicts[0]
+
+def fit_planes(points, slicerTransform = True):
+    '''
+    Least-squares plane fit of one or many point sets, from the principal axes of the centred points.
+
+    All the point sets are fitted together: their 3x3 covariance matrices are accumulated in one pass
+    and decomposed in one batched call, with no mesh round-trip.
+
+    Args:
+        points (numpy.ndarray, str, vtkMRMLMarkupsNode or list): (N, 3) array, markup node (name), or list of them
+        slicerTransform (bool): Return the plane-to-world transform (Slicer convention: x and y in-plane, z along the normal) 
+            instead of the world-to-plane transform (x along the normal). Default True.
+
+    Returns:
+        plane_dict (dict): 'origin', 'normal', 'transform' (4x4) of the plane, plus its in-plane 'axes' (2, 3) 
+            and 'size' (extent of the points along the axes). List of dicts for a list of point sets.
+    '''
+
+    batch = isinstance(points, (list, tuple))
+    point_sets = list(points) if batch else [points]
+    point_sets = [p if isinstance(p, np.ndarray) else points_array_from_markup(p) for p in point_sets]
+
+    counts = np.array([len(p) for p in point_sets])
+    if np.any(counts < 3):
+        raise ValueError("At least 3 points are required to fit a plane")
+
+    stacked = np.concatenate(point_sets).astype(float)
+    set_ids = np.repeat(np.arange(len(point_sets)), counts)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    centroids = np.add.reduceat(stacked, starts, axis=0) / counts[:, None]
+    centred = stacked - centroids[set_ids]
+    covariances = np.add.reduceat(centred[:, :, None] * centred[:, None, :], starts, axis=0)
+
+    # Eigenvectors in ascending eigenvalue order: normal first, largest in-plane axis last
+    _, eigenvectors = np.linalg.eigh(covariances)
+
+    plane_dicts = []
+    for i in range(len(point_sets)):
+        normal = eigenvectors[i][:, 0]
+        axis_1 = eigenvectors[i][:, 2]
+        axis_2 = np.cross(normal, axis_1)
+
+        # Right-handed plane frame with the normal along z
+        plane_to_world = np.eye(4)
+        plane_to_world[:3, 0] = axis_1
+        plane_to_world[:3, 1] = axis_2
+        plane_to_world[:3, 2] = normal
+        plane_to_world[:3, 3] = centroids[i]
+
+        if slicerTransform:
+            transform = plane_to_world
+        else:
+            # Plane frame with the normal along x
+            normal_to_world = plane_to_world[:, [2, 0, 1, 3]]
+            transform = np.linalg.inv(normal_to_world)
+
+        in_plane = centred[set_ids == i] @ np.stack((axis_1, axis_2)).T
+        plane_dicts.append({'origin' : centroids[i],
+                            'normal' : normal,
+                            'transform' : transform,
+                            'axes' : np.stack((axis_1, axis_2)),
+                            'size' : np.ptp(in_plane, axis=0)})
+
+    if batch:
+        return plane_dicts
+
+    return plane_dicts[0]
+
+def _plane_model(plane_dict, namePlane):
+    '''
+    Add a plane model node spanning the fitted points along the in-plane axes of ```plane_dict```.
+    '''
+
+    from vtk import vtkPlaneSource
+
+    axes, size = plane_dict['axes'], plane_dict['size']
+    corner = plane_dict['origin'] - 0.5 * (size[0] * axes[0] + size[1] * axes[1])
+
+    planeSource = vtkPlaneSource()
+    planeSource.SetOrigin(corner)
+    planeSource.SetPoint1(corner + size[0] * axes[0])
+    planeSource.SetPoint2(corner + size[1] * axes[1])
+    planeSource.Update()
 
+    planeNode = slicer.modules.models.logic().AddModel(planeSource.GetOutput())
+    planeNode.SetName(namePlane)
+
+    return planeNode
 
 def get_furthest_voronoi_vertex(voronoid_vertices, points):
-    
-    from numpy import asarray, argmin
-    from numpy.linalg import norm
-    
-    # Find furthest Voronoi node from the point cloud
-    def closest_node(node, nodes):
-        nodes = asarray(nodes)
-        deltas = nodes - node
-        dist = norm(deltas, axis=1)
-        min_idx = argmin(dist)
-        return nodes[min_idx], dist[min_idx], deltas[min_idx][1]/deltas[min_idx][0]  # point, distance, slope
-    
-    if len(points) >= 4:
-        defect_radius = 0
-        center_defect = None
-        for v in voronoid_vertices:
-            _, d, _ = closest_node(v, points)
-            if d > defect_radius:
-                defect_radius = d
-                center_defect = v
+    '''
+    Voronoi vertex furthest from the point cloud, i.e. the center of the largest empty circle.
+
+    Args:
+        voronoid_vertices (numpy.ndarray): (V, d) Voronoi vertices, see ```voronoi_diagram()```
+        points (numpy.ndarray): (N, d) points of the Voronoi diagram
+
+    Returns:
+        center_defect (numpy.ndarray), defect_radius (float): furthest vertex and its distance to the closest point. (None, 0) with fewer than 4 points.
+    '''
+
+    if len(points) < 4 or len(voronoid_vertices) == 0:
+        return None, 0
+
+    centers, radii = largest_empty_circles(voronoid_vertices, points, k=1)
+
+    return centers[0], radii[0]
+
+def largest_empty_circles(voronoid_vertices, points, k=1):
+    '''
+    Top-k largest empty circle candidates among the Voronoi vertices, see ```PointSetGeometry.largest_empty_circles()```.
+
+    Args:
+        voronoid_vertices (numpy.ndarray): (V, d) Voronoi vertices, see ```voronoi_diagram()```
+        points (numpy.ndarray or scipy.spatial.cKDTree): (N, d) points of the Voronoi diagram, or a KD-tree built on them
+        k (int): number of candidates to return. Default 1.
+
+    Returns:
+        centers (numpy.ndarray), radii (numpy.ndarray): (k, d) candidate centers and their radii, sorted by decreasing radius
+    '''
+
+    from scipy.spatial import cKDTree
+
+    if isinstance(points, cKDTree):
+        points = points.data
+
+    return point_geometry(points).largest_empty_circles(k=k, vertices=voronoid_vertices)
+
+def minimumCylinder_from_pointMarkup(pointNodename = 'F', nameCylinder = 'Cylinder', approximate = False, tolerance = 1e-3, create_model = True):
+    '''
+    Minimum volume cylinder enclosing the points of a Point List Node.
+
+    The exact mode runs ```trimesh.bounds.minimum_cylinder```. The approximate mode (```approximate_minimum_cylinder()```)
+    is much faster on large point clouds; see examples/cylinder_benchmark to compare both on your data.
+
+    Args:
+        pointNodename (str, vtkMRMLMarkupsNode or numpy.ndarray): Name of the markup node containing the point list, the node, or a (N, 3) array. Default "F"
+        nameCylinder (str): Name of the cylinder model node. Default "Cylinder"
+        approximate (bool): Use the approximate mode. Default False.
+        tolerance (float): axis angle tolerance (radians) of the approximate mode. Default 1e-3.
+        create_model (bool): Add a cylinder model node to the scene. Default True.
+
+    Returns:
+        cylinderNode (MRMLCore.vtkMRMLModelNode or None), cylinder_dict (dict): cylinder model node and 'radius', 'height', 'transform' of the cylinder
+    '''
 
-    return center_defect, defect_radius
+    points = pointNodename if isinstance(pointNodename, np.ndarray) else points_array_from_markup(pointNodename)
 
+    if approximate:
+        cylinder_dict = approximate_minimum_cylinder(points, tolerance=tolerance)
+    else:
+        from trimesh.points import PointCloud
+        from trimesh.bounds import minimum_cylinder
 
-def minimumCylinder_from_pointMarkup(pointNodename = 'F', nameCylinder = 'Cylinder'):
+        cylinder_dict = minimum_cylinder(PointCloud(points))
+
+    if not create_model:
+        return None, cylinder_dict
 
-    from trimesh.points import PointCloud
     from pyvista import wrap
-    from trimesh.bounds import minimum_cylinder
     from trimesh.primitives import Cylinder
-    
-    df_points = points_from_markup(pointNodename)
 
-    points_mesh = PointCloud(df_points.to_numpy())
-    
-    cylinder_dict = minimum_cylinder(points_mesh)
-    
     cylinder_primitive = Cylinder(radius=cylinder_dict['radius'], 
                                   height=cylinder_dict['height'], 
                                   transform=cylinder_dict['transform'])
@@ -89,34 +287,64 @@ def minimumCylinder_from_pointMarkup(pointNodename = 'F', nameCylinder = 'Cylind
 
     return cylinderNode, cylinder_dict
 
+def points_array_from_markup(pointNodename = 'F', world = False):
+    '''
+    Extract all points of one or many Point List Nodes as numpy arrays.
+
+    Positions are read in one call (```GetControlPointPositionsWorld```) instead of one call per point, 
+    unless local coordinates are requested on a transformed node.
+
+    Args:
+        pointNodename (str, vtkMRMLMarkupsNode or list): Name of the markup node containing the point list, the node itself, or a list of them. Default "F"
+        world (bool): Return world coordinates, i.e. including parent transforms. Default False (node coordinates, as ```points_from_markup()```).
+
+    Returns:
+        points (numpy.ndarray): (N, 3) array of points in (r,a,s) coordinate system, or list of arrays for a list of nodes
+    '''
+
+    from numpy import zeros
+    from vtk import vtkPoints
+    from vtk.util.numpy_support import vtk_to_numpy
+
+    if isinstance(pointNodename, (list, tuple)):
+        return [points_array_from_markup(name, world=world) for name in pointNodename]
+
+    if isinstance(pointNodename, str):
+        pointListNode = slicer.util.getNode(pointNodename)
+    else:
+        pointListNode = pointNodename
+
+    if pointListNode.GetNumberOfControlPoints() == 0:
+        return zeros((0, 3))
+
+    if world or pointListNode.GetParentTransformNode() is None:
+        points = vtkPoints()
+        pointListNode.GetControlPointPositionsWorld(points)
+        return vtk_to_numpy(points.GetData()).astype(float)
+
+    return slicer.util.arrayFromMarkupsControlPoints(pointListNode, world=False)
+
 def points_from_markup(pointNodename = 'F'):   
     '''
     Extract points from a Point List Node 
 
+    DataFrame wrapper of ```points_array_from_markup()```.
+
     Args:
-        nodename (str): Name of the markup node containing the poiunt list. Default "F"
+        nodename (str or list): Name of the markup node containing the poiunt list, or list of names. Default "F"
 
     Returns:
-        df_points (pandas.DataFrame): pandas dataframe listing all points in (r,s,a) coordinate system
+        df_points (pandas.DataFrame): pandas dataframe listing all points in (r,s,a) coordinate system, or list of dataframes for a list of names
     '''
 
-    from pandas import DataFrame, concat
-    from vtk import vtkVector3d
+    from pandas import DataFrame
 
-    lineListNode = slicer.util.getNode(pointNodename)
+    if isinstance(pointNodename, (list, tuple)):
+        return [points_from_markup(name) for name in pointNodename]
 
     #colnames = ['x', 'y', 'z']
     colnames = ['r', 'a', 's']
-    df_points = DataFrame(columns=colnames)
-
-    for i in range(lineListNode.GetNumberOfControlPoints()):
-        pt = vtkVector3d(0,0,0)
-        lineListNode.GetNthControlPointPosition(i,pt)
-
-        # append point data to points_df
-        df = DataFrame(data = [list(pt)], columns=colnames, index = [i])
-
-        df_points = concat([df_points, df])
+    df_points = DataFrame(data=points_array_from_markup(pointNodename), columns=colnames)
         
     return df_points
 
@@ -127,9 +355,9 @@ def project_markupPoints_to_plane(pointNodename,
 
     from trimesh.points import project_to_plane
     
-    df_points = points_from_markup(pointNodename)
+    points = points_array_from_markup(pointNodename)
             
-    projected_points = project_to_plane(df_points.to_numpy(), 
+    projected_points = project_to_plane(points, 
                                         plane_normal=plane_normal,
                                         plane_origin=plane_origin,
                                         return_planar=return_planar
@@ -137,33 +365,485 @@ def project_markupPoints_to_plane(pointNodename,
 
     return projected_points
 
+def project_markupPoints_to_planes(pointNodenames, planes, return_planar=True):
+    '''
+    Project the points of many Point List Nodes onto many planes with one set of matrix operations.
+
+    Planar coordinates follow ```trimesh.points.project_to_plane``` (same in-plane frame), so 
+    ```projected[j, offsets[i]:offsets[i+1]]``` equals ```project_markupPoints_to_plane(pointNodenames[i], ...)``` on plane j.
+
+    Args:
+        pointNodenames (list): names of the markup nodes, markup nodes or (N, 3) arrays
+        planes (list): plane_dict (with 'normal' and 'origin', see ```fit_planes()```) or (plane_normal, plane_origin) pair for each plane
+        return_planar (bool): return 2D coordinates in the plane frame, else 3D coordinates in the plane frame (z is the distance to the plane). Default True.
+
+    Returns:
+        projected_points (numpy.ndarray): (n_planes, n_points, 2) or (n_planes, n_points, 3) coordinates of the points of all nodes, stacked
+        offsets (numpy.ndarray): (n_nodes + 1,) start index of the points of each node, followed by n_points
+    '''
+
+    from trimesh.geometry import plane_transform
+
+    if isinstance(pointNodenames, (str, np.ndarray)):
+        pointNodenames = [pointNodenames]
+    point_sets = [p if isinstance(p, np.ndarray) else points_array_from_markup(p) for p in pointNodenames]
+
+    offsets = np.concatenate(([0], np.cumsum([len(p) for p in point_sets])))
+    points = np.concatenate(point_sets).astype(float)
+
+    normals, origins = [], []
+    for plane in planes:
+        if isinstance(plane, dict):
+            normals.append(plane['normal'])
+            origins.append(plane['origin'])
+        else:
+            normals.append(plane[0])
+            origins.append(plane[1])
+    normals = np.asarray(normals, dtype=float)
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    origins = np.asarray(origins, dtype=float)
+
+    # (n_planes, 4, 4) world-to-plane transforms, as trimesh.points.project_to_plane
+    transforms = np.stack([plane_transform(origin=o, normal=n) for o, n in zip(origins, normals)])
+    n_dims = 2 if return_planar else 3
+    projected = np.einsum('pij,nj->pni', transforms[:, :n_dims, :3], points) + transforms[:, None, :n_dims, 3]
+
+    return projected, offsets
+
+def ransacCylinder_from_pointMarkup(pointNodename = 'F', nameCylinder = 'Cylinder', threshold = 1.0, max_iterations = 2000, 
+                                    batch_size = 256, confidence = 0.99, seed = 0, create_model = True):
+    '''
+    Robust cylinder fit (RANSAC) of the points of a Point List Node, insensitive to stray landmarks.
+
+    Each hypothesis pairs a candidate axis direction (principal axes of the points or a random direction)
+    with the circle through 3 random points projected orthogonally to it. Hypotheses are scored in 
+    vectorized batches by counting the points closer than ```threshold``` to the cylinder surface,
+    and the best one is refined by least squares on its inliers.
+
+    Args:
+        pointNodename (str, vtkMRMLMarkupsNode or numpy.ndarray): Name of the markup node containing the point list, the node, or a (N, 3) array. Default "F"
+        nameCylinder (str): Name of the cylinder model node. Default "Cylinder"
+        threshold (float): maximum distance (mm) of an inlier to the cylinder surface. Default 1.0.
+        max_iterations (int): maximum number of hypotheses. Default 2000.
+        batch_size (int): number of hypotheses scored together. Default 256.
+        confidence (float): stop once the probability of having drawn an outlier-free sample reaches it. Default 0.99.
+        seed (int): seed of the random sampling, for reproducible fits. Default 0.
+        create_model (bool): Add a cylinder model node to the scene. Default True.
+
+    Returns:
+        cylinderNode (MRMLCore.vtkMRMLModelNode or None), cylinder_dict (dict): 'radius', 'height' and 'transform' as 
+            ```minimumCylinder_from_pointMarkup()```, plus the boolean 'inliers' mask
+    '''
+
+    points = pointNodename if isinstance(pointNodename, np.ndarray) else points_array_from_markup(pointNodename)
+    points = np.asarray(points, dtype=float)
+    rng = np.random.default_rng(seed)
+
+    # Candidate axis directions: principal axes of the points first, then random directions
+    _, _, principal_axes = np.linalg.svd(points - points.mean(axis=0), full_matrices=False)
+
+    def axis_directions(n):
+        directions = rng.normal(size=(n, 3))
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        principal = rng.random(n) < 0.5
+        directions[principal] = principal_axes[rng.integers(0, 3, size=principal.sum())]
+        return directions
+
+    def hypothesize(samples):
+        directions = axis_directions(len(samples))
+        # Orthonormal basis (u, v) of the plane orthogonal to each direction
+        helper = np.where(np.abs(directions[:, :1]) < 0.9, [[1.0, 0, 0]], [[0, 1.0, 0]])
+        u = np.cross(directions, helper)
+        u /= np.linalg.norm(u, axis=1, keepdims=True)
+        v = np.cross(directions, u)
+        # Circle through the 3 projected points
+        xy = np.stack((np.einsum('bsk,bk->bs', samples, u), np.einsum('bsk,bk->bs', samples, v)), axis=2)
+        A = 2 * (xy[:, 1:] - xy[:, :1])
+        b = (xy[:, 1:] ** 2).sum(axis=2) - (xy[:, :1] ** 2).sum(axis=2)
+        valid = np.abs(np.linalg.det(A)) > 1e-12
+        A[~valid] = np.eye(2)
+        center_xy = np.linalg.solve(A, b[..., None])[..., 0]
+        radius = np.linalg.norm(xy[:, 0] - center_xy, axis=1)
+        center = center_xy[:, :1] * u + center_xy[:, 1:] * v
+        radius[~valid] = np.inf
+        return directions, center, radius
+
+    def residuals(params, points):
+        directions, center, radius = params
+        # Expanded squared distances and projections, so that only (B, N) arrays are built
+        along = directions @ points.T - np.einsum('bk,bk->b', center, directions)[:, None]
+        squared = (points ** 2).sum(axis=1) - 2 * center @ points.T + (center ** 2).sum(axis=1)[:, None]
+        radial = np.sqrt(np.maximum(squared - along ** 2, 0))
+        return np.abs(radial - radius[:, None])
+
+    best, inliers = _ransac(points, 3, hypothesize, residuals, threshold, max_iterations, batch_size, confidence, rng)
+    direction, center, radius = (param[0] for param in best)
+
+    # Least-squares refinement of the axis and radius on the inliers
+    from scipy.optimize import least_squares
+
+    for _ in range(3):
+        def radial_residuals(x):
+            axis = x[3:6] / np.linalg.norm(x[3:6])
+            offsets = points[inliers] - x[:3]
+            along = offsets @ axis
+            return np.sqrt(np.maximum((offsets ** 2).sum(axis=1) - along ** 2, 0)) - x[6]
+
+        x = least_squares(radial_residuals, np.concatenate((center, direction, [radius]))).x
+        center, direction, radius = x[:3], x[3:6] / np.linalg.norm(x[3:6]), abs(x[6])
+        refined_inliers = residuals((direction[None], center[None], np.array([radius])), points)[0] < threshold
+        if refined_inliers.sum() < 3 or np.array_equal(refined_inliers, inliers):
+            break
+        inliers = refined_inliers
+
+    # Re-estimate the radius, length and center of the cylinder from the inliers
+    offsets = points[inliers] - center
+    along = offsets @ direction
+    radial = np.sqrt(np.maximum((offsets ** 2).sum(axis=1) - along ** 2, 0))
+    radius = float(np.median(radial))
+    height = float(np.ptp(along))
+    origin = center + direction * (along.min() + along.max()) / 2
+
+    helper = [1.0, 0, 0] if abs(direction[0]) < 0.9 else [0, 1.0, 0]
+    x_axis = np.cross(direction, helper)
+    x_axis /= np.linalg.norm(x_axis)
+    transform = np.eye(4)
+    transform[:3, 0] = x_axis
+    transform[:3, 1] = np.cross(direction, x_axis)
+    transform[:3, 2] = direction
+    transform[:3, 3] = origin
+
+    cylinder_dict = {'radius' : radius,
+                     'height' : height,
+                     'transform' : transform,
+                     'inliers' : inliers}
+
+    cylinderNode = None
+    if create_model:
+        from pyvista import wrap
+        from trimesh.primitives import Cylinder
+
+        cylinder_primitive = Cylinder(radius=radius, height=height, transform=transform)
+        cylinderNode = slicer.modules.models.logic().AddModel(wrap(cylinder_primitive.to_mesh()))
+        cylinderNode.SetName(nameCylinder)
+
+    return cylinderNode, cylinder_dict
+
+def ransacPlane_from_pointMarkup(pointNodename = 'F', namePlane = 'Fitting Plane', threshold = 1.0, max_iterations = 1000, 
+                                 batch_size = 256, confidence = 0.99, seed = 0, slicerTransform = True, create_model = True):
+    '''
+    Robust plane fit (RANSAC) of the points of a Point List Node, insensitive to stray landmarks.
+
+    Planes through 3 random points are scored in vectorized batches by counting the points closer than 
+    ```threshold``` to them. The best plane is then refitted on its inliers with ```fit_planes()```.
+
+    Args:
+        pointNodename (str, vtkMRMLMarkupsNode or numpy.ndarray): Name of the markup node containing the point list, the node, or a (N, 3) array. Default "F"
+        namePlane (str): Name of the plane model node. Default "Fitting Plane"
+        threshold (float): maximum distance (mm) of an inlier to the plane. Default 1.0.
+        max_iterations (int): maximum number of hypotheses. Default 1000.
+        batch_size (int): number of hypotheses scored together. Default 256.
+        confidence (float): stop once the probability of having drawn an outlier-free sample reaches it. Default 0.99.
+        seed (int): seed of the random sampling, for reproducible fits. Default 0.
+        slicerTransform (bool): see ```fit_planes()```. Default True.
+        create_model (bool): Add a plane model node to the scene. Default True.
+
+    Returns:
+        planeNode (MRMLCore.vtkMRMLModelNode or None), plane_dict (dict): as ```fitPlane_from_pointMarkup()```, plus the boolean 'inliers' mask
+    '''
+
+    points = pointNodename if isinstance(pointNodename, np.ndarray) else points_array_from_markup(pointNodename)
+    points = np.asarray(points, dtype=float)
+
+    def hypothesize(samples):
+        normals = np.cross(samples[:, 1] - samples[:, 0], samples[:, 2] - samples[:, 0])
+        norms = np.linalg.norm(normals, axis=1, keepdims=True)
+        # Collinear samples never get inliers
+        normals = np.where(norms > 0, normals / np.where(norms > 0, norms, 1), np.nan)
+        return samples[:, 0], normals
+
+    def residuals(params, points):
+        origins, normals = params
+        distances = np.abs(points @ normals.T - np.einsum('bk,bk->b', origins, normals)).T
+        return np.where(np.isnan(distances), np.inf, distances)
+
+    rng = np.random.default_rng(seed)
+    _, inliers = _ransac(points, 3, hypothesize, residuals, threshold, max_iterations, batch_size, confidence, rng)
+
+    plane_dict = fit_planes(points[inliers], slicerTransform=slicerTransform)
+    plane_dict['inliers'] = inliers
+
+    planeNode = _plane_model(plane_dict, namePlane) if create_model else None
+
+    return planeNode, plane_dict
+
+def _ransac(points, sample_size, hypothesize, residuals, threshold, max_iterations, batch_size, confidence, rng):
+    '''
+    Generic RANSAC loop scoring batches of hypotheses at once.
+
+    ```hypothesize(samples)``` maps (B, sample_size, 3) sampled points to a tuple of per-hypothesis parameter arrays, 
+    ```residuals(params, points)``` returns the (B, N) distances of the points to each hypothesis.
+    Batches are reduced so that B * N stays under ```RANSAC_MAX_RESIDUALS```.
+    Returns the parameters of the best hypothesis (arrays of length 1) and its inlier mask.
+    '''
+
+    n_points = len(points)
+    if n_points < sample_size:
+        raise ValueError(f"At least {sample_size} points are required")
+
+    batch_size = max(1, min(batch_size, RANSAC_MAX_RESIDUALS // n_points))
+    best_count, best_params, best_inliers = -1, None, None
+    iterations, needed = 0, max_iterations
+
+    while iterations < min(needed, max_iterations):
+        batch = min(batch_size, max_iterations - iterations)
+        if n_points <= 64:
+            # Distinct indices within each sample
+            indices = np.argsort(rng.random((batch, n_points)), axis=1)[:, :sample_size]
+        else:
+            # Repeated indices are rare and give degenerate hypotheses without inliers
+            indices = rng.integers(0, n_points, size=(batch, sample_size))
+        params = hypothesize(points[indices])
+        inliers = residuals(params, points) < threshold
+        counts = inliers.sum(axis=1)
+
+        b = int(np.argmax(counts))
+        if counts[b] > best_count:
+            best_count = counts[b]
+            best_params = tuple(param[b:b + 1] for param in params)
+            best_inliers = inliers[b]
+            # Adaptive number of hypotheses for the current inlier ratio
+            inlier_ratio = best_count / n_points
+            if inlier_ratio >= 1:
+                needed = 0
+            elif inlier_ratio > 0:
+                needed = int(np.ceil(np.log(1 - confidence) / np.log(1 - inlier_ratio ** sample_size)))
+
+        iterations += batch
+
+    return best_params, best_inliers
+
+def point_geometry(points):
+    '''
+    Triangulation-based geometry of a point set, cached per point set.
+
+    Repeated calls with the same points (e.g. during interactive defect analysis) return the same 
+    ```PointSetGeometry``` object, so the Delaunay triangulation is not computed again.
+    The ```GEOMETRY_CACHE_SIZE``` most recently used point sets are kept.
+
+    Args:
+        points (numpy.ndarray): (N, d) points
+
+    Returns:
+        geometry (PointSetGeometry)
+    '''
+
+    from hashlib import sha1
+
+    points = np.ascontiguousarray(points, dtype=float)
+    key = (points.shape, sha1(points.tobytes()).hexdigest())
+
+    if key in _geometry_cache:
+        _geometry_cache.move_to_end(key)
+        return _geometry_cache[key]
+
+    geometry = PointSetGeometry(points)
+    _geometry_cache[key] = geometry
+    while len(_geometry_cache) > GEOMETRY_CACHE_SIZE:
+        _geometry_cache.popitem(last=False)
+
+    return geometry
+
 def voronoi_diagram(points, only_inside_vertices=True):
+    '''
+    Voronoi diagram of a point set, derived from its cached Delaunay triangulation (see ```PointSetGeometry.voronoi```).
 
-    from scipy.spatial import Voronoi
-    
-    # Get Voronoid diagram of the projected points
-    vor = Voronoi(points)
+    Args:
+        points (numpy.ndarray): (N, d) points
+        only_inside_vertices (bool): only return the vertices inside the convex hull of the points. Default True.
+
+    Returns:
+        vertices (numpy.ndarray): (V, d) Voronoi vertices
+        vor (VoronoiDiagram): 'vertices', 'ridge_vertices' and 'ridge_points' of the diagram, as in scipy.spatial.Voronoi
+    '''
+
+    geometry = point_geometry(points)
+    vor = geometry.voronoi
     
     # Store only vertices inside convex hull of points
     if only_inside_vertices:
-        def in_hull(p, hull):
-            """
-            Test if points in `p` are in `hull`
-        
-            `p` should be a `NxK` coordinates of `N` points in `K` dimensions
-            `hull` is either a scipy.spatial.Delaunay object or the `MxK` array of the 
-            coordinates of `M` points in `K`dimensions for which Delaunay triangulation
-            will be computed
-            """
-            from scipy.spatial import Delaunay
-            if not isinstance(hull,Delaunay):
-                hull = Delaunay(hull)
-        
-            return hull.find_simplex(p)>=0
-
-        inside_hull = in_hull(vor.vertices, points)
+        inside_hull = geometry.in_hull(vor.vertices)
         
         return vor.vertices[inside_hull], vor
 
     return vor.vertices, vor
 
+class PointSetGeometry:
+    '''
+    Delaunay triangulation of a point set and the quantities derived from it.
+
+    The Voronoi vertices are the circumcenters of the Delaunay simplices and their distance to the 
+    nearest site is the circumradius, so hull membership, Voronoi vertices and empty circles all come 
+    from a single triangulation. Use ```point_geometry()``` to get a cached instance.
+
+    Args:
+        points (numpy.ndarray): (N, d) points
+    '''
+
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=float)
+
+    @cached_property
+    def delaunay(self):
+        '''scipy.spatial.Delaunay triangulation of the points (computed on first access).'''
+
+        from scipy.spatial import Delaunay
+
+        return Delaunay(self.points)
+
+    @cached_property
+    def circumcenters(self):
+        '''(S, d) circumcenters of the Delaunay simplices.'''
+
+        simplices = self.points[self.delaunay.simplices]
+        p0 = simplices[:, 0]
+        A = 2 * (simplices[:, 1:] - p0[:, None])
+        b = (simplices[:, 1:] ** 2).sum(axis=2) - (p0 ** 2).sum(axis=1)[:, None]
+        try:
+            return np.linalg.solve(A, b[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            # Degenerate (flat) simplices
+            return (np.linalg.pinv(A) @ b[..., None])[..., 0]
+
+    @cached_property
+    def circumradii(self):
+        '''(S,) circumradii of the Delaunay simplices, i.e. distance of each circumcenter to its nearest sites.'''
+
+        return np.linalg.norm(self.circumcenters - self.points[self.delaunay.simplices[:, 0]], axis=1)
+
+    @cached_property
+    def kdtree(self):
+        '''scipy.spatial.cKDTree of the points, for nearest-site queries of arbitrary locations.'''
+
+        from scipy.spatial import cKDTree
+
+        return cKDTree(self.points)
+
+    @cached_property
+    def voronoi(self):
+        '''
+        Voronoi diagram derived from the triangulation, without running a separate scipy.spatial.Voronoi.
+
+        The vertices are the unique circumcenters. Each pair of neighbouring simplices gives a ridge between their
+        circumcenters, separating the sites of their shared facet, and hull facets give ridges to infinity (index -1).
+        In 2D these are exactly the Voronoi ridges of scipy.spatial.Voronoi (in any order), in higher dimensions the Voronoi edges.
+        '''
+
+        vertex_of_simplex = self._vertex_of_simplex
+        simplices, neighbors = self.delaunay.simplices, self.delaunay.neighbors
+        n_simplices, n_vertices = simplices.shape
+
+        # One ridge per facet: simplex s and the neighbour opposite to its vertex k
+        s = np.repeat(np.arange(n_simplices), n_vertices)
+        k = np.tile(np.arange(n_vertices), n_simplices)
+        n = neighbors.ravel()
+        keep = (n == -1) | (s < n)
+        s, k, n = s[keep], k[keep], n[keep]
+
+        ridge_vertices = np.column_stack((vertex_of_simplex[s], np.where(n == -1, -1, vertex_of_simplex[np.maximum(n, 0)])))
+        facets = simplices[s][np.arange(n_vertices)[None, :] != k[:, None]].reshape(len(s), n_vertices - 1)
+
+        # Co-circular sites collapse ridges to a single vertex
+        valid = ridge_vertices[:, 0] != ridge_vertices[:, 1]
+
+        return VoronoiDiagram(self._unique_vertices, ridge_vertices[valid], facets[valid])
+
+    @cached_property
+    def _unique_vertex_idx(self):
+        '''Index of the first simplex of each unique circumcenter, and the unique vertex of each simplex.'''
+
+        # Co-circular sites share a Voronoi vertex
+        scale = max(np.ptp(self.points, axis=0).max(), 1.0)
+        _, unique_idx, inverse = np.unique(np.round(self.circumcenters / scale, 9), axis=0, return_index=True, return_inverse=True)
+
+        # Keep the vertices in simplex order
+        order = np.argsort(unique_idx)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+
+        return unique_idx[order], rank[np.ravel(inverse)]
+
+    @property
+    def _unique_vertices(self):
+        return self.circumcenters[self._unique_vertex_idx[0]]
+
+    @property
+    def _vertex_of_simplex(self):
+        return self._unique_vertex_idx[1]
+
+    def in_hull(self, p):
+        '''
+        Test if the (M, d) points `p` are inside the convex hull of the point set.
+        '''
+
+        return self.delaunay.find_simplex(p) >= 0
+
+    def largest_empty_circles(self, k=1, only_inside=True, vertices=None):
+        '''
+        Top-k largest empty circle candidates among the Voronoi vertices.
+
+        The radius of each candidate center is its distance to the nearest site: the circumradius for the vertices
+        of the triangulation, or one vectorized KD-tree query for given ```vertices```.
+
+        Args:
+            k (int): number of candidates to return. Default 1.
+            only_inside (bool): only consider centers inside the convex hull. Default True.
+            vertices (numpy.ndarray): (V, d) candidate centers. Default None uses the Voronoi vertices of the triangulation.
+
+        Returns:
+            centers (numpy.ndarray), radii (numpy.ndarray): (k, d) candidate centers and their radii, sorted by decreasing radius
+        '''
+
+        if vertices is None:
+            vertices, radii = self.voronoi_vertices(only_inside=only_inside)
+        else:
+            vertices = np.asarray(vertices, dtype=float)
+            radii = self.nearest_distance(vertices)
+
+        k = min(k, len(radii))
+        if k < len(radii):
+            top = np.argpartition(-radii, k - 1)[:k]
+        else:
+            top = np.arange(len(radii))
+        top = top[np.argsort(-radii[top])]
+
+        return vertices[top], radii[top]
+
+    def nearest_distance(self, p):
+        '''
+        Distance of the (M, d) points `p` to their nearest site.
+        '''
+
+        distances, _ = self.kdtree.query(p, k=1)
+
+        return distances
+
+    def voronoi_vertices(self, only_inside=True):
+        '''
+        Voronoi vertices and their distance to the nearest site, derived from the triangulation.
+
+        Args:
+            only_inside (bool): only keep vertices inside the convex hull. Default True.
+
+        Returns:
+            vertices (numpy.ndarray), radii (numpy.ndarray): (V, d) unique Voronoi vertices and their distance to the nearest site
+        '''
+
+        unique_idx = self._unique_vertex_idx[0]
+        vertices, radii = self.circumcenters[unique_idx], self.circumradii[unique_idx]
+
+        if only_inside:
+            inside = self.in_hull(vertices)
+            vertices, radii = vertices[inside], radii[inside]
+
+        return vertices, radii
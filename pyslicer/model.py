@@ -1,4 +1,26 @@
 import slicer
+import logging
+from functools import lru_cache
+
+# Canonical hollow cylinder meshes kept by create_hollow_cylinder(), read once at import: see clear_hollow_cylinder_cache()
+HOLLOW_CYLINDER_CACHE_SIZE = 32
+
+def clear_hollow_cylinder_cache(maxsize=None):
+    '''
+    Empty the mesh cache of ```create_hollow_cylinder()```, optionally resizing it.
+
+    The cache size is taken from ```HOLLOW_CYLINDER_CACHE_SIZE``` when the module is imported, so changing the
+    constant afterwards has no effect: pass the new size here instead.
+
+    Args:
+        maxsize (int): number of cached meshes. Default None keeps the current size.
+    '''
+
+    global _canonical_hollow_cylinder
+
+    _canonical_hollow_cylinder.cache_clear()
+    if maxsize is not None and maxsize != _canonical_hollow_cylinder.cache_info().maxsize:
+        _canonical_hollow_cylinder = lru_cache(maxsize=maxsize)(_canonical_hollow_cylinder.__wrapped__)
 
 def create_hollow_cylinder(height=1, 
                            radius_inner=0, radius_outer=1, space =5, 
@@ -7,27 +29,49 @@ def create_hollow_cylinder(height=1,
                            transform=False,
                            nameModel='Cylinder', 
                            color=(230/255, 230/255, 77/255), 
-                           opacity=1):
+                           opacity=1,
+                           direct=False):
+    '''
+    Add a hollow cylinder model node.
 
-    from pyvista import CylinderStructured
-    from numpy import linspace
-    from vtk import vtkMatrix4x4
-    from numpy import ndarray
-    
-    cyl_hollow = CylinderStructured(radius=linspace(radius_inner, radius_outer, space), height=height, direction=direction, center=center)
+    The cylinder surface is built once per (height, radii, space) in a canonical position and kept in a 
+    bounded LRU cache (```HOLLOW_CYLINDER_CACHE_SIZE``` meshes, see ```clear_hollow_cylinder_cache()```), so placing many identical cylinders only 
+    applies the placement transform (direction, center, then ```transform```) to a copy of the cached mesh.
+
+    Args:
+        height (float): cylinder height. Default 1.
+        radius_inner, radius_outer (float): inner and outer radii. Default 0 and 1.
+        space (int): number of radial grid layers of the structured cylinder. Default 5.
+        center (tuple): center of the cylinder. Default (0, 0, 0).
+        direction (tuple): direction of the cylinder axis. Default (0, 0, 1).
+        transform (vtkMRMLTransformNode, vtkMatrix4x4 or numpy.ndarray): transform applied last. Default False.
+        nameModel (str): name of the model node. Default 'Cylinder'.
+        color (tuple): display color, in scale 0-1.
+        opacity (float): display opacity. Default 1.
+        direct (bool): generate the hollow cylinder surface directly instead of extracting it from 
+            a pyvista.CylinderStructured grid (also supports radius_inner=0). Default False.
+
+    Returns:
+        cyl_node (MRMLCore.vtkMRMLModelNode): cylinder model node
+    '''
+
+    import numpy as np
+
+    cyl_surface = _canonical_hollow_cylinder(float(height), float(radius_inner), float(radius_outer), int(space), bool(direct)).copy()
+
+    # Placement: rotate the z axis onto direction, move to center, then apply the transform
+    direction = np.asarray(direction, dtype=float)
+    direction /= np.linalg.norm(direction)
+    placement = np.eye(4)
+    placement[:3, :3] = _rotation_z_to(direction)
+    placement[:3, 3] = center
 
     if transform is not False:
-        if isinstance(transform, slicer.vtkMRMLTransformNode):
-            transformMatrix = vtkMatrix4x4()
-            transform.GetMatrixTransformToWorld(transformMatrix)
-            transformArray = slicer.util.arrayFromVTKMatrix(transformMatrix)
+        placement = transform_to_array(transform) @ placement
 
-        if isinstance(transform, ndarray):
-            transformArray = transform
-        
-        cyl_hollow = cyl_hollow.transform(transformArray)
+    cyl_surface.transform(placement, inplace=True)
 
-    cyl_node = slicer.modules.models.logic().AddModel(cyl_hollow.extract_surface())
+    cyl_node = slicer.modules.models.logic().AddModel(cyl_surface)
         
     cyl_node.SetName(nameModel)
     
@@ -37,14 +81,92 @@ def create_hollow_cylinder(height=1,
 
     return cyl_node
 
+@lru_cache(maxsize=HOLLOW_CYLINDER_CACHE_SIZE)
+def _canonical_hollow_cylinder(height, radius_inner, radius_outer, space, direct, theta_resolution=32):
+    '''
+    Hollow cylinder surface centred at the origin along z. Cached: callers must copy it before modifying it.
+    '''
+
+    import numpy as np
+    from pyvista import CylinderStructured, PolyData
+
+    if not direct:
+        return CylinderStructured(radius=np.linspace(radius_inner, radius_outer, space), height=height, 
+                                  direction=(0, 0, 1), center=(0, 0, 0), theta_resolution=theta_resolution).extract_surface()
+
+    n = theta_resolution
+    theta = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    hollow = radius_inner > 0
+    radii = [radius_outer, radius_inner] if hollow else [radius_outer]
+
+    # Rings of points: index = ring * 2n + z_level * n + k (ring 0 outer, 1 inner; z_level 0 bottom, 1 top)
+    points = np.array([[r * np.cos(t), r * np.sin(t), z] for r in radii for z in (-height / 2, height / 2) for t in theta])
+
+    k = np.arange(n)
+    k1 = (k + 1) % n
+    ob, ot = k, n + k
+    ob1, ot1 = k1, n + k1
+
+    # Quads with outward normals
+    quads = [np.stack((ob, ob1, ot1, ot), axis=1)]
+    faces = []
+    if hollow:
+        ib, it = 2 * n + k, 3 * n + k
+        ib1, it1 = 2 * n + k1, 3 * n + k1
+        quads += [np.stack((ib1, ib, it, it1), axis=1),
+                  np.stack((ot, ot1, it1, it), axis=1),
+                  np.stack((ob1, ob, ib, ib1), axis=1)]
+    else:
+        faces += [np.concatenate(([n], ot)), np.concatenate(([n], ob[::-1]))]
+
+    quads = np.concatenate(quads)
+    faces = np.concatenate([np.column_stack((np.full(len(quads), 4), quads)).ravel()] + faces)
 
-def decimate_model(modelNode, reductionFactor = 0.8):
+    return PolyData(points, faces=faces)
+
+def _rigid_transform(source, target):
+    '''
+    4x4 rigid transform minimizing the squared distances from the source to the target points (Kabsch).
+    '''
+
+    import numpy as np
+
+    source_center, target_center = source.mean(axis=0), target.mean(axis=0)
+    U, _, Vt = np.linalg.svd((source - source_center).T @ (target - target_center))
+    d = np.sign(np.linalg.det(Vt.T @ U.T))
+
+    matrix = np.eye(4)
+    matrix[:3, :3] = Vt.T @ np.diag([1.0, 1.0, d]) @ U.T
+    matrix[:3, 3] = target_center - matrix[:3, :3] @ source_center
+
+    return matrix
+
+def _rotation_z_to(direction):
+    '''
+    3x3 rotation matrix mapping the z axis onto the unit vector ```direction```.
+    '''
+
+    import numpy as np
+
+    z = np.array([0.0, 0.0, 1.0])
+    axis = np.cross(z, direction)
+    s, c = np.linalg.norm(axis), np.dot(z, direction)
+    if s < 1e-12:
+        return np.eye(3) if c > 0 else np.diag([1.0, -1.0, -1.0])
+
+    k = axis / s
+    K = np.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+
+    return np.eye(3) + s * K + (1 - c) * K @ K
+
+def decimate_model(modelNode, reductionFactor = 0.8, in_process = False):
     '''
     Model decimation from the [SurfaceToolbox module](https://github.com/Slicer/SlicerSurfaceToolbox/blob/master/SurfaceToolbox/SurfaceToolbox.py)
     
     Args:
         modelNode (MRMLCore.vtkMRMLModelNode): input model node 
         reductionFactor (double): reduction factor for element surface decimation. Default is 0.8
+        in_process (bool): decimate in process with ```decimate_polydata()``` instead of running the decimation CLI. Default is False
 
     Returns:
         modelNode_deciamted (MRMLCore.vtkMRMLModelNode): decimated model node 
@@ -55,6 +177,11 @@ def decimate_model(modelNode, reductionFactor = 0.8):
     modelNode_deciamted = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLModelNode')
     modelNode_deciamted.SetName(modelNode.GetName()+'_decimated')
 
+    if in_process:
+        modelNode_deciamted.SetAndObservePolyData(decimate_polydata(modelNode.GetPolyData(), reductionFactor))
+        modelNode_deciamted.CreateDefaultDisplayNodes()
+        return modelNode_deciamted
+
     parameters = {
       "inputModel": modelNode,
       "outputModel": modelNode_deciamted,
@@ -69,6 +196,146 @@ def decimate_model(modelNode, reductionFactor = 0.8):
     
     return modelNode_deciamted
 
+def decimate_models(modelNodes, reductionFactor = 0.8, max_parallel = 4, in_process = False, callback = None):
+    '''
+    Decimate many models concurrently.
+
+    By default the decimation CLI is launched asynchronously (```slicer.cli.run```) for at most ```max_parallel``` 
+    models at a time; the next job starts when one completes, driven by the CLI status events, so this function 
+    returns immediately and the jobs progress while Slicer processes events.
+    With ```in_process=True``` the meshes are decimated with ```decimate_polydata()``` in a pool of ```max_parallel``` 
+    threads, which skips the serialization of big meshes to the CLI; the function then returns when all are done.
+
+    Args:
+        modelNodes (list): input model nodes
+        reductionFactor (double): reduction factor for element surface decimation. Default is 0.8
+        max_parallel (int): maximum number of concurrent decimations. Default is 4
+        in_process (bool): decimate in process instead of running the decimation CLI. Default is False
+        callback (callable): optional ```callback(modelNode, decimatedNode)``` called on the main thread when a model is done
+
+    Returns:
+        futures (list of concurrent.futures.Future): one per model, resolved with the decimated model node.
+            Cancelling a future before its decimation starts skips that model. Callback errors are logged.
+    '''
+
+    from concurrent.futures import Future
+
+    futures = [Future() for _ in modelNodes]
+
+    def finish(modelNode, outputNode, future):
+        # A user callback error must not stop the remaining decimations
+        try:
+            if not future.done():
+                future.set_result(outputNode)
+            if callback is not None:
+                callback(modelNode, outputNode)
+        except Exception:
+            logging.exception(f"Decimation callback of {modelNode.GetName()} failed")
+
+    def fail(future, error):
+        if not future.done():
+            future.set_exception(error)
+
+    if in_process:
+        from concurrent.futures import ThreadPoolExecutor
+        from vtk import vtkPolyData
+
+        # Copy the inputs on the main thread, decimate in the pool, add the nodes on the main thread
+        inputs = []
+        for modelNode in modelNodes:
+            polydata = vtkPolyData()
+            polydata.DeepCopy(modelNode.GetPolyData())
+            inputs.append(polydata)
+
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            jobs = [executor.submit(decimate_polydata, polydata, reductionFactor) for polydata in inputs]
+            for modelNode, job, future in zip(modelNodes, jobs, futures):
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    outputNode = slicer.modules.models.logic().AddModel(job.result())
+                except Exception as error:
+                    fail(future, error)
+                    continue
+                outputNode.SetName(modelNode.GetName()+'_decimated')
+                finish(modelNode, outputNode, future)
+
+        return futures
+
+    import qt
+
+    pending = list(zip(modelNodes, futures))
+    running = {}
+
+    def on_status_modified(cliNode, event):
+        if cliNode.IsBusy() or cliNode.GetID() not in running:
+            return
+
+        observer, modelNode, outputNode, future = running.pop(cliNode.GetID())
+        cliNode.RemoveObserver(observer)
+
+        try:
+            if cliNode.GetStatusString() == 'Completed':
+                finish(modelNode, outputNode, future)
+            else:
+                slicer.mrmlScene.RemoveNode(outputNode)
+                fail(future, RuntimeError(f"Decimation of {modelNode.GetName()} failed: {cliNode.GetErrorText()}"))
+        finally:
+            # cliNode is a temporary node, removed once its event is processed
+            qt.QTimer.singleShot(0, lambda: slicer.mrmlScene.RemoveNode(cliNode))
+            launch_next()
+
+    def launch_next():
+        while pending and len(running) < max_parallel:
+            modelNode, future = pending.pop(0)
+            if not future.set_running_or_notify_cancel():
+                # Cancelled by the caller before it started
+                continue
+
+            outputNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLModelNode')
+            outputNode.SetName(modelNode.GetName()+'_decimated')
+
+            parameters = {
+              "inputModel": modelNode,
+              "outputModel": outputNode,
+              "reductionFactor": reductionFactor,
+              "method": "FastQuadric",
+              "boundaryDeletion": True
+              }
+
+            cliNode = slicer.cli.run(slicer.modules.decimation, None, parameters, wait_for_completion=False)
+            observer = cliNode.AddObserver(slicer.vtkMRMLCommandLineModuleNode.StatusModifiedEvent, on_status_modified)
+            running[cliNode.GetID()] = (observer, modelNode, outputNode, future)
+
+    launch_next()
+
+    return futures
+
+def decimate_polydata(polydata, reductionFactor = 0.8):
+    '''
+    In-process quadric decimation of a surface mesh with vtkQuadricDecimation.
+
+    Args:
+        polydata (vtk.vtkPolyData): input surface mesh
+        reductionFactor (double): target fraction of triangles to remove. Default is 0.8
+
+    Returns:
+        decimated (vtk.vtkPolyData): decimated surface mesh
+    '''
+
+    from vtk import vtkQuadricDecimation, vtkTriangleFilter
+
+    triangles = vtkTriangleFilter()
+    triangles.SetInputData(polydata)
+
+    decimation = vtkQuadricDecimation()
+    decimation.SetInputConnection(triangles.GetOutputPort())
+    decimation.SetTargetReduction(reductionFactor)
+    decimation.VolumePreservationOn()
+    decimation.Update()
+
+    return decimation.GetOutput()
+
 def extrude_polygon_from_points(points,
                                 height=1, 
                                 sort_points = True,
@@ -82,67 +349,235 @@ def extrude_polygon_from_points(points,
                                 opacity=1):
 
     """
-    Convert a sequence of 2d coordinates to an extruded polygon
+    Convert a sequence of 2d coordinates to an extruded polygon, see ```extrude_polygon_mesh()```
     """
+
+    solid = extrude_polygon_mesh(points, height=height, sort_points=sort_points,
+                                 rotate_x=rotate_x, rotate_y=rotate_y, rotate_z=rotate_z,
+                                 scale=scale, transform=transform)
+
+    extrude_node = slicer.modules.models.logic().AddModel(solid.extract_surface())
+        
+    extrude_node.SetName(nameModel)
     
-    from pyvista import PolyData
-    from vtk import vtkMatrix4x4
-    from numpy import ndarray
+    modelDisplayNode = extrude_node.GetDisplayNode()
+    modelDisplayNode.SetColor(color[0], color[1], color[2])
+    modelDisplayNode.SetOpacity(opacity)
+
+    return extrude_node
+
+def extrude_polygon_mesh(points,
+                         height=1, 
+                         sort_points = True,
+                         rotate_x=0,
+                         rotate_y=0,
+                         rotate_z=0,
+                         scale=(0, 0, 0),
+                         transform=False):
+    """
+    Extrude a sequence of 2d coordinates along z into a pyvista mesh centred on z=0.
+
+    The centring, rotations (degrees, about the origin, applied in x, y, z order), scaling and
+    optional transform are composed into a single 4x4 matrix applied to the mesh once.
+
+    Args:
+        points (numpy.ndarray or list): (N, 2) polygon points
+        height (float): extrusion height. Default 1.
+        sort_points (bool): order the points clockwise first, see ```sort_points_clockwise()```. Default True.
+        rotate_x, rotate_y, rotate_z (float): rotation angles in degrees. Default 0.
+        scale (tuple): scale factors along x, y, z. Default (0, 0, 0) does not scale.
+        transform (vtkMRMLTransformNode, vtkMatrix4x4 or numpy.ndarray): transform applied last. Default False.
+
+    Returns:
+        solid (pyvista.PolyData): extruded polygon
+    """
     
-    z0 = 0
+    import numpy as np
+    from pyvista import PolyData
 
-    if isinstance(points, ndarray):
-        points = points.tolist()
+    points = np.asarray(points, dtype=float)[:, :2]
 
     if sort_points is not False:
         points = sort_points_clockwise(points, clockwise=True)
     
     # bounding polygon
     #Convert a sequence of 2d coordinates to a polydata with a polygon
-    faces = [len(points), *range(len(points))]
-    polygon = PolyData([p + [z0,] for p in points], faces=faces).triangulate()
+    n_points = len(points)
+    faces = np.concatenate(([n_points], np.arange(n_points)))
+    polygon = PolyData(np.column_stack((points, np.zeros(n_points))), faces=faces).triangulate()
     
     # extrude
     solid = polygon.extrude((0, 0, height), capping=True)
 
-    solid.translate((0, 0, -height/2), inplace=True)
-    
-    if rotate_x!=0:
-        solid.rotate_x(rotate_x, inplace=True)
+    solid.transform(extrusion_matrix(height=height, rotate_x=rotate_x, rotate_y=rotate_y, rotate_z=rotate_z,
+                                     scale=scale, transform=transform), inplace=True)
 
-    if rotate_y!=0:
-        solid.rotate_y(rotate_y, inplace=True)
-        
-    if rotate_z!=0:
-        solid.rotate_z(rotate_z, inplace=True)
+    return solid
 
-    if scale!=(0, 0, 0):
-        solid.scale(scale, inplace=True)
-        
-    if transform is not False:
-        if isinstance(transform, slicer.vtkMRMLTransformNode):
-            transformMatrix = vtkMatrix4x4()
-            transform.GetMatrixTransformToWorld(transformMatrix)
-            transformArray = slicer.util.arrayFromVTKMatrix(transformMatrix)
+def extrude_polygons_from_points(polygons,
+                                 height=1, 
+                                 sort_points = True,
+                                 rotate_x=0,
+                                 rotate_y=0,
+                                 rotate_z=0,
+                                 scale=(0, 0, 0),
+                                 transform=False,
+                                 nameModel='Extrude', 
+                                 color=(230/255, 230/255, 77/255), 
+                                 colors=None,
+                                 opacity=1):
 
-        if isinstance(transform, vtkMatrix4x4):
-            transformArray = slicer.util.arrayFromVTKMatrix(transform)
+    """
+    Extrude many polygons into a single model node.
 
-        if isinstance(transform, ndarray):
-            transformArray = transform
-        
-        solid = solid.transform(transformArray)
+    All the extruded polygons are appended into one polydata, so the scene holds one model and 
+    one display node instead of one per polygon. The 'PolygonID' cell array records which polygon 
+    each cell comes from.
 
-    extrude_node = slicer.modules.models.logic().AddModel(solid.extract_surface())
-        
+    Args:
+        polygons (list): list of (N, 2) polygon points
+        height, rotate_x, rotate_y, rotate_z, scale, transform: as ```extrude_polygon_mesh()```, 
+            either one value for all polygons or a list with one value per polygon
+        sort_points (bool): order the points of each polygon clockwise first. Default True.
+        nameModel (str): name of the model node. Default 'Extrude'.
+        color (tuple): display color of the model, in scale 0-1.
+        colors (list): optional (r, g, b) color per polygon, in scale 0-1, stored in the 'Colors' cell array and displayed directly.
+        opacity (float): display opacity. Default 1.
+
+    Returns:
+        extrude_node (MRMLCore.vtkMRMLModelNode): model node of all the extruded polygons
+    """
+
+    import numpy as np
+    from vtk import vtkAppendPolyData
+
+    n_polygons = len(polygons)
+
+    def per_polygon(value, value_ndim):
+        # One value per polygon when given with an extra dimension
+        if np.ndim(value) == value_ndim + 1:
+            return list(value)
+        return [value] * n_polygons
+
+    heights = per_polygon(height, 0)
+    rotations = [per_polygon(angle, 0) for angle in (rotate_x, rotate_y, rotate_z)]
+    scales = per_polygon(scale, 1)
+    transforms = list(transform) if isinstance(transform, (list, tuple)) else [transform] * n_polygons
+
+    appendFilter = vtkAppendPolyData()
+    for i, points in enumerate(polygons):
+        solid = extrude_polygon_mesh(points, height=heights[i], sort_points=sort_points,
+                                     rotate_x=rotations[0][i], rotate_y=rotations[1][i], rotate_z=rotations[2][i],
+                                     scale=scales[i], transform=transforms[i])
+        solid.cell_data['PolygonID'] = np.full(solid.n_cells, i, dtype=np.int32)
+        if colors is not None:
+            solid.cell_data['Colors'] = np.tile(np.round(np.asarray(colors[i][:3]) * 255).astype(np.uint8), (solid.n_cells, 1))
+        appendFilter.AddInputData(solid)
+    appendFilter.Update()
+
+    extrude_node = slicer.modules.models.logic().AddModel(appendFilter.GetOutput())
     extrude_node.SetName(nameModel)
-    
+
     modelDisplayNode = extrude_node.GetDisplayNode()
     modelDisplayNode.SetColor(color[0], color[1], color[2])
     modelDisplayNode.SetOpacity(opacity)
 
+    if colors is not None:
+        from vtk import vtkAssignAttribute
+        modelDisplayNode.SetActiveScalar('Colors', vtkAssignAttribute.CELL_DATA)
+        modelDisplayNode.SetScalarRangeFlag(slicer.vtkMRMLDisplayNode.UseDirectMapping)
+        modelDisplayNode.ScalarVisibilityOn()
+
     return extrude_node
 
+def extrusion_matrix(height=1, rotate_x=0, rotate_y=0, rotate_z=0, scale=(0, 0, 0), transform=False):
+    """
+    4x4 matrix placing an extruded polygon: centring along z, rotations in x, y, z order (degrees),
+    scaling and optional transform, composed in this order.
+    """
+
+    import numpy as np
+
+    def rotation(axis, angle):
+        c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+        i, j = [(1, 2), (2, 0), (0, 1)][axis]
+        matrix = np.eye(4)
+        matrix[i, i], matrix[i, j], matrix[j, i], matrix[j, j] = c, -s, s, c
+        return matrix
+
+    matrix = np.eye(4)
+    matrix[2, 3] = -height/2
+
+    for axis, angle in enumerate((rotate_x, rotate_y, rotate_z)):
+        if angle != 0:
+            matrix = rotation(axis, angle) @ matrix
+
+    if any(scale):
+        matrix = np.diag([*scale, 1]) @ matrix
+
+    if transform is not False:
+        matrix = transform_to_array(transform) @ matrix
+
+    return matrix
+
+def icp_points_to_model(points, model, max_iterations=100, tolerance=1e-6, initial_matrix=None, align_centroids=True):
+    '''
+    Rigid iterative closest point (ICP) registration of points onto a model surface, without the Slicer GUI.
+
+    At each iteration the closest model vertex of every point is found with a KD-tree and the rigid transform
+    minimizing their distances is solved in closed form (SVD, Kabsch). The model vertices approximate the surface,
+    so dense meshes give the most accurate results.
+
+    Args:
+        points (numpy.ndarray): (N, 3) points to register, e.g. fiducial positions
+        model (MRMLCore.vtkMRMLModelNode, numpy.ndarray or scipy.spatial.cKDTree): model node, (M, 3) model vertices,
+            or a KD-tree built on them to reuse across registrations
+        max_iterations (int): maximum number of ICP iterations. Default is 100
+        tolerance (float): stop when the mean distance improves by less than this. Default is 1e-6
+        initial_matrix (numpy.ndarray): 4x4 initial transform of the points. Default None is the identity
+        align_centroids (bool): start by translating the points centroid onto the model vertices centroid,
+            if no ```initial_matrix``` is given. Default is True
+
+    Returns:
+        matrix (numpy.ndarray): 4x4 transform from the points to the model
+        mean_distance (float): mean distance of the registered points to their closest model vertex
+    '''
+
+    import numpy as np
+    from scipy.spatial import cKDTree
+
+    if isinstance(model, cKDTree):
+        tree = model
+    elif isinstance(model, slicer.vtkMRMLModelNode):
+        tree = cKDTree(slicer.util.arrayFromModelPoints(model))
+    else:
+        tree = cKDTree(np.asarray(model, dtype=float))
+
+    points = np.asarray(points, dtype=float)
+
+    matrix = np.eye(4)
+    if initial_matrix is not None:
+        matrix = np.array(initial_matrix, dtype=float)
+    elif align_centroids:
+        matrix[:3, 3] = tree.data.mean(axis=0) - points.mean(axis=0)
+
+    mean_distance = np.inf
+    for _ in range(max_iterations):
+        moved = points @ matrix[:3, :3].T + matrix[:3, 3]
+        distances, idx = tree.query(moved, k=1)
+
+        previous, mean_distance = mean_distance, distances.mean()
+        if previous - mean_distance < tolerance:
+            break
+
+        matrix = _rigid_transform(moved, tree.data[idx]) @ matrix
+
+    # Distances of the final transform
+    moved = points @ matrix[:3, :3].T + matrix[:3, 3]
+    mean_distance = tree.query(moved, k=1)[0].mean()
+
+    return matrix, mean_distance
+
 def load(filename, color=(0,0,0), opacity=0):
 
     model = slicer.util.loadModel(filename)
@@ -157,20 +592,38 @@ def load(filename, color=(0,0,0), opacity=0):
 
     return model
 
-def register_model_to_points(inputModel, inputFiducials):
+def register_model_to_points(inputModel, inputFiducials, headless=False):
+    '''
+    Register a model onto fiducial points.
+
+    Args:
+        inputModel (MRMLCore.vtkMRMLModelNode): model node
+        inputFiducials (slicer.vtkMRMLMarkupsFiducialNode): fiducial node with points on the model surface
+        headless (bool): register with ```icp_points_to_model()``` instead of the FiducialsToModelRegistration module,
+            whose widget cannot be created in batch. Default is False
+
+    Returns:
+        transformNode (slicer.vtkMRMLTransformNode): transform moving the model onto the fiducials
+    '''
 
     from vtk import vtkMatrix4x4
-    
-    # Create output transform node
-    transformNode = slicer.vtkMRMLTransformNode()
 
-    # Run module logic with default settings
-    fiducialsModelLogic = slicer.modules.fiducialstomodelregistration.widgetRepresentation().self().logic
-    
-    fiducialsModelLogic.run(inputFiducials, inputModel, transformNode)
+    if headless:
+        points = slicer.util.arrayFromMarkupsControlPoints(inputFiducials, world=True)
+        matrix, _ = icp_points_to_model(points, inputModel)
+        transformMatrix = slicer.util.vtkMatrixFromArray(matrix)
+    else:
+        # Create output transform node
+        transformNode = slicer.vtkMRMLTransformNode()
+
+        # Run module logic with default settings
+        fiducialsModelLogic = slicer.modules.fiducialstomodelregistration.widgetRepresentation().self().logic
+        
+        fiducialsModelLogic.run(inputFiducials, inputModel, transformNode)
+
+        transformMatrix = vtkMatrix4x4()
+        transformNode.GetMatrixTransformToWorld(transformMatrix)
 
-    transformMatrix = vtkMatrix4x4()
-    transformNode.GetMatrixTransformToWorld(transformMatrix)
     transformMatrix.Invert()
 
     # Create new transform node with the inverted transform matrix
@@ -180,12 +633,54 @@ def register_model_to_points(inputModel, inputFiducials):
 
     return transformNode
 
+def register_models_to_points(templateModel, points_list, create_transforms=False, **kwargs):
+    '''
+    Register one template model onto the points of many specimens, building the template KD-tree once.
+
+    Args:
+        templateModel (MRMLCore.vtkMRMLModelNode or numpy.ndarray): template model node or its (M, 3) vertices
+        points_list (list): (N, 3) point arrays, or fiducial nodes, one per specimen
+        create_transforms (bool): also add a transform node per specimen, as ```register_model_to_points()```. Default is False
+        **kwargs: ```icp_points_to_model()``` options (max_iterations, tolerance, align_centroids)
+
+    Returns:
+        matrices (list): 4x4 transforms moving the template onto each specimen points
+        mean_distances (list): mean registration distance of each specimen
+        transformNodes (list): transform nodes, only if ```create_transforms``` is True
+    '''
+
+    import numpy as np
+    from scipy.spatial import cKDTree
+
+    if isinstance(templateModel, slicer.vtkMRMLModelNode):
+        tree = cKDTree(slicer.util.arrayFromModelPoints(templateModel))
+    else:
+        tree = cKDTree(np.asarray(templateModel, dtype=float))
+
+    matrices, mean_distances, transformNodes = [], [], []
+    for points in points_list:
+        if isinstance(points, slicer.vtkMRMLMarkupsNode):
+            points = slicer.util.arrayFromMarkupsControlPoints(points, world=True)
+
+        matrix, mean_distance = icp_points_to_model(points, tree, **kwargs)
+        matrices.append(np.linalg.inv(matrix))
+        mean_distances.append(mean_distance)
+
+        if create_transforms:
+            transformNode = slicer.mrmlScene.AddNewNodeByClass("vtkMRMLTransformNode")
+            transformNode.SetMatrixTransformToParent(slicer.util.vtkMatrixFromArray(matrices[-1]))
+            transformNodes.append(transformNode)
+
+    if create_transforms:
+        return matrices, mean_distances, transformNodes
+
+    return matrices, mean_distances
+
 def shrink_or_swell_shapely_polygon(my_polygon, factor=0.10, swell=False):
     ''' returns the shapely polygon which is smaller or bigger by passed factor.
         If swell = True , then it returns bigger polygon, else smaller '''
     from shapely import geometry
 
-    shrink_factor = 0.10 #Shrink by 10%
     xs = list(my_polygon.exterior.coords.xy[0])
     ys = list(my_polygon.exterior.coords.xy[1])
     x_center = 0.5 * min(xs) + 0.5 * max(xs)
@@ -202,41 +697,129 @@ def shrink_or_swell_shapely_polygon(my_polygon, factor=0.10, swell=False):
     
     return my_polygon_resized
 
-def sort_points_clockwise(points, clockwise=True):
+def shrink_or_swell_shapely_polygons(polygons, factor=0.10, swell=False, chunk_size=None, workers=1, quad_segs=16):
+    '''
+    Batch version of ```shrink_or_swell_shapely_polygon()``` for many polygons (requires shapely >= 2).
 
-    from numpy import ndarray, array
-    from math import atan2
+    Each polygon is buffered by ```factor``` times the distance from its bounding box center to a corner, as in
+    ```shrink_or_swell_shapely_polygon()```. The bounding boxes and distances are computed on arrays and the polygons
+    are buffered with the vectorized ```shapely.buffer```. Shapely releases the GIL in its vectorized functions,
+    so chunks of polygons can be buffered in parallel threads.
 
-    if isinstance(points, ndarray):
-        points_list = points.tolist()
+    Args:
+        polygons (list or numpy.ndarray): shapely polygons
+        factor (float or numpy.ndarray): resize factor, one for all polygons or one per polygon. Default is 0.10
+        swell (bool): if True the polygons are enlarged, else shrunk. Default is False
+        chunk_size (int): number of polygons buffered per task. Default None buffers all polygons at once
+        workers (int): number of threads buffering the chunks. Default is 1
+        quad_segs (int): segments per quarter circle of the rounded corners. Default is 16, as ```Polygon.buffer()```
+
+    Returns:
+        polygons_resized (numpy.ndarray): array of resized shapely polygons
+    '''
+
+    import numpy as np
+    import shapely
+
+    polygons = np.asarray(polygons, dtype=object)
+
+    # Bounding box center to corner distance, i.e. half the bounding box diagonal
+    minx, miny, maxx, maxy = shapely.bounds(polygons).T
+    distances = 0.5 * np.hypot(maxx - minx, maxy - miny) * factor
+    if not swell:
+        distances = -distances
+
+    if chunk_size is None or chunk_size >= len(polygons):
+        return shapely.buffer(polygons, distances, quad_segs=quad_segs)
+
+    starts = range(0, len(polygons), chunk_size)
+    buffer_chunk = lambda start: shapely.buffer(polygons[start:start + chunk_size], distances[start:start + chunk_size], quad_segs=quad_segs)
+
+    if workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(buffer_chunk, starts))
     else:
-        points_list = points
-    
-    def argsort(seq):
-        #http://stackoverflow.com/questions/3382352/equivalent-of-numpy-argsort-in-basic-python/3382369#3382369
-        #by unutbu
-        #https://stackoverflow.com/questions/3382352/equivalent-of-numpy-argsort-in-basic-python 
-        # from Boris Gorelik
-        return sorted(range(len(seq)), key=seq.__getitem__)
-    
-    def rotational_sort(list_of_xy_coords, centre_of_rotation_xy_coord, clockwise=True):
-        cx,cy=centre_of_rotation_xy_coord
-        angles = [atan2(x-cx, y-cy) for x,y in list_of_xy_coords]
-        indices = argsort(angles)
-        if clockwise:
-            return [list_of_xy_coords[i] for i in indices]
-        else:
-            return [list_of_xy_coords[i] for i in indices[::-1]]
-
-    def centeroid_list_points(data):
-        x, y = zip(*data)
-        l = len(x)
-        return sum(x) / l, sum(y) / l
-
-    points_sorted = rotational_sort(points_list, centeroid_list_points(points), clockwise)
+        chunks = [buffer_chunk(start) for start in starts]
+
+    return np.concatenate(chunks)
+
+def sort_points_clockwise(points, clockwise=True):
+    '''
+    Order the 2D points of a polygon around their centroid.
+
+    Args:
+        points (numpy.ndarray or list): (N, 2) polygon points
+        clockwise (bool): clockwise order, else counterclockwise. Default True.
+
+    Returns:
+        points_sorted (numpy.ndarray or list): sorted points, of the same type as the input
+    '''
+
+    from numpy import ndarray, asarray, arctan2, argsort
+
+    points_array = asarray(points, dtype=float)
+
+    centroid = points_array[:, :2].mean(axis=0)
+    angles = arctan2(points_array[:, 0] - centroid[0], points_array[:, 1] - centroid[1])
+    indices = argsort(angles, kind='stable')
+    if not clockwise:
+        indices = indices[::-1]
 
     if isinstance(points, ndarray):
-        points_sorted = array(points_sorted)
+        return points[indices]
+
+    return [points[i] for i in indices]
+
+def sort_polygons_clockwise(points, offsets, clockwise=True):
+    '''
+    Order the 2D points of many polygons around their centroids in one vectorized call.
+
+    The polygons are given as ragged arrays: the points of polygon i are ```points[offsets[i]:offsets[i+1]]```.
+
+    Args:
+        points (numpy.ndarray): (M, 2) points of all the polygons, stacked
+        offsets (numpy.ndarray): (P+1,) start index of each polygon in ```points```, followed by M
+        clockwise (bool): clockwise order, else counterclockwise. Default True.
+
+    Returns:
+        points_sorted (numpy.ndarray): (M, 2) sorted points. Each polygon keeps its slice ```offsets[i]:offsets[i+1]```.
+    '''
+
+    from numpy import asarray, arctan2, arange, bincount, diff, lexsort, repeat
+
+    points = asarray(points)
+    offsets = asarray(offsets)
+    counts = diff(offsets)
+    polygon_ids = repeat(arange(len(counts)), counts)
+
+    # Centroid of each polygon
+    cx = bincount(polygon_ids, weights=points[:, 0], minlength=len(counts)) / counts
+    cy = bincount(polygon_ids, weights=points[:, 1], minlength=len(counts)) / counts
+
+    angles = arctan2(points[:, 0] - cx[polygon_ids], points[:, 1] - cy[polygon_ids])
+    indices = lexsort((angles, polygon_ids))
+
+    if not clockwise:
+        # Reverse the order inside each polygon
+        positions = arange(len(points))
+        indices = indices[offsets[polygon_ids] + offsets[polygon_ids + 1] - 1 - positions]
+
+    return points[indices]
+
+def transform_to_array(transform):
+    """
+    4x4 numpy array of a transform given as a transform node (matrix to world), vtkMatrix4x4 or numpy array.
+    """
+
+    from vtk import vtkMatrix4x4
+
+    if isinstance(transform, slicer.vtkMRMLTransformNode):
+        transformMatrix = vtkMatrix4x4()
+        transform.GetMatrixTransformToWorld(transformMatrix)
+        return slicer.util.arrayFromVTKMatrix(transformMatrix)
 
-    return points_sorted
+    if isinstance(transform, vtkMatrix4x4):
+        return slicer.util.arrayFromVTKMatrix(transform)
 
+    return transform
@@ -1,5 +1,70 @@
 import slicer
 
+def bulk_edit_segments(segmentationNode, keep=None, remove=None, colors=None, copy=None, output_segmentationNode=None):
+    """
+    Keep, remove, recolor and copy many segments at once.
+
+    The name to ID index is built once and all the changes are applied inside a single
+    StartModify/EndModify block of the segmentation nodes, so the scene receives one burst of
+    modified events (and the views re-render once) instead of one per segment.
+    The operations are applied in this order: recolor, copy, keep/remove.
+
+    Parameters
+    ----------
+    segmentationNode : vtkMRMLSegmentationNode
+        The segmentation node to edit.
+    keep : list of str, optional
+        Names of the segments to keep; all the other segments are removed.
+    remove : list of str, optional
+        Names of the segments to remove.
+    colors : dict, optional
+        Segment name -> (r, g, b) color in scale 0-1.
+    copy : list of str, optional
+        Names of the segments to copy into `output_segmentationNode`.
+    output_segmentationNode : vtkMRMLSegmentationNode, optional
+        Destination of the copied segments.
+
+    Returns
+    -------
+    dict
+        Segment name -> segment ID index of `segmentationNode` after the edit.
+    """
+    if copy and output_segmentationNode is None:
+        raise ValueError("output_segmentationNode is required to copy segments")
+
+    segmentation = segmentationNode.GetSegmentation()
+    name_to_ids = segment_ids_by_name(segmentationNode, all_ids=True)
+
+    wasModified = segmentationNode.StartModify()
+    if copy:
+        wasModifiedOutput = output_segmentationNode.StartModify()
+
+    try:
+        if colors:
+            for segment_name, color in colors.items():
+                for segment_id in name_to_ids.get(segment_name, []):
+                    segmentation.GetSegment(segment_id).SetColor(color)
+
+        if copy:
+            output_segmentation = output_segmentationNode.GetSegmentation()
+            for segment_name in copy:
+                for segment_id in name_to_ids.get(segment_name, []):
+                    output_segmentation.CopySegmentFromSegmentation(segmentation, segment_id)
+
+        remove_names = set(remove) if remove else set()
+        if keep is not None:
+            remove_names |= set(name_to_ids) - set(keep)
+
+        for segment_name in remove_names:
+            for segment_id in name_to_ids.pop(segment_name, []):
+                segmentation.RemoveSegment(segment_id)
+    finally:
+        if copy:
+            output_segmentationNode.EndModify(wasModifiedOutput)
+        segmentationNode.EndModify(wasModified)
+
+    return {name: ids[0] for name, ids in name_to_ids.items()}
+
 def closing_holes(kernelSize_mm, segment_name, segmentEditorNode, segmentEditorWidget):
     '''
     Closing (fill holes) [MORPHOLOGICAL_CLOSING] smoothing from the [SegmentEditorSmoothingEffect] (https://github.com/Slicer/Slicer/blob/294ef47edbac2ccb194d5ee982a493696795cdc0/Modules/Loadable/Segmentations/EditorEffects/Python/SegmentEditorSmoothingEffect.py)
@@ -34,9 +99,14 @@ def compute_threshold(method, volumeNode):
 
 def copy_segment_newNode(segment_name, input_segmentationNode, output_segmentationNode):
     '''
-
+    Copy a segment, or a list of segments, into another segmentation node.
+    A list of names is copied in one batch, see ```bulk_edit_segments()```.
     '''
 
+    if not isinstance(segment_name, str):
+        bulk_edit_segments(input_segmentationNode, copy=segment_name, output_segmentationNode=output_segmentationNode)
+        return
+
     segmentation = input_segmentationNode.GetSegmentation()
     sourceSegmentId = segmentation.GetSegmentIdBySegmentName(segment_name)
     
@@ -59,7 +129,8 @@ def gaussian_smoothing(gaussiaSD_mm, segment_name, segmentEditorNode, segmentEdi
 
 def individual_segment_to_labelmapNode(segmentName, segmentationNode, volumeNode):
     '''
-
+    Export one segment to a new labelmap node. 
+    To get many segments as numpy arrays use ```segments_to_labelmap_array()``` or ```segments_to_mask_arrays()```.
     '''
     
     labelmapNode = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLLabelMapVolumeNode')
@@ -103,27 +174,19 @@ def keep_segments_by_name(segment_names, segmentationNode):
     segmentationNode : vtkMRMLSegmentationNode
         The segmentation node to clean.
     """
-    segmentation = segmentationNode.GetSegmentation()
-
-    # Get all existing segment IDs first (avoid modifying while iterating)
-    all_segment_ids = [
-        segmentation.GetNthSegmentID(i)
-        for i in range(segmentation.GetNumberOfSegments())
-    ]
+    bulk_edit_segments(segmentationNode, keep=segment_names)
 
-    # Remove segments not in the keep list
-    for seg_id in all_segment_ids:
-        seg_name = segmentation.GetSegment(seg_id).GetName()
-        if seg_name not in segment_names:
-            segmentation.RemoveSegment(seg_id)
-
-def logical_intersect(segment_name, modifier_segment_name, segmentationNode, segmentEditorNode, segmentEditorWidget):
+def logical_intersect(segment_name, modifier_segment_name, segmentationNode, segmentEditorNode, segmentEditorWidget, name_to_id=None):
     '''
+    name_to_id (dict): optional segment name -> ID index from ```segment_ids_by_name()```, to avoid a lookup per call in loops.
     '''
     
     segmentEditorNode.SetSelectedSegmentID(segment_name)
     
-    modifier_segmentId = segmentationNode.GetSegmentation().GetSegmentIdBySegmentName(modifier_segment_name)
+    if name_to_id is not None:
+        modifier_segmentId = name_to_id[modifier_segment_name]
+    else:
+        modifier_segmentId = segmentationNode.GetSegmentation().GetSegmentIdBySegmentName(modifier_segment_name)
     
     segmentEditorWidget.setActiveEffectByName("Logical operators")
     effect = segmentEditorWidget.activeEffect()
@@ -139,7 +202,8 @@ def margin_segmentation(
     segment_name=None,
     margin_pixels=None,
     margin_mm=None,
-    apply_to_all_visible=False
+    apply_to_all_visible=False,
+    name_to_id=None
 ):
     """
     Apply Margin effect (grow/shrink) to segmentation.
@@ -154,6 +218,8 @@ def margin_segmentation(
     margin_mm : float, optional
         Margin size in millimeters.
         Example: -0.1 → shrink by 0.1 mm.
+    name_to_id : dict, optional
+        Segment name -> ID index from `segment_ids_by_name()`, to avoid a lookup per call in loops.
     """
 
     # --- Safety checks ---------------------------------------------------------
@@ -173,7 +239,10 @@ def margin_segmentation(
     if apply_to_all_visible:
         effect.setParameter("ApplyToAllVisibleSegments", 1)
     else:
-        segmentID = segmentationNode.GetSegmentation().GetSegmentIdBySegmentName(segment_name)
+        if name_to_id is not None:
+            segmentID = name_to_id[segment_name]
+        else:
+            segmentID = segmentationNode.GetSegmentation().GetSegmentIdBySegmentName(segment_name)
         segmentEditorNode.SetSelectedSegmentID(segmentID)
 
     effect.setParameter("MarginSizeMm", str(margin_mm))
@@ -284,6 +353,36 @@ def stats_to_dataframe(stats, orientation="long"):
     df_wide = df_wide[cols]
     return df_wide
 
+def segment_ids_by_name(segmentationNode, all_ids=False):
+    """
+    Build a segment name -> segment ID index of a segmentation with a single pass over its segments.
+
+    Use it instead of repeated calls to GetSegmentIdBySegmentName(), which scans all segments each time.
+
+    Parameters
+    ----------
+    segmentationNode : vtkMRMLSegmentationNode
+        The segmentation node to index.
+    all_ids : bool, default False
+        If True, map each name to the list of all the segment IDs with that name.
+        Otherwise map each name to its first segment ID, as GetSegmentIdBySegmentName().
+
+    Returns
+    -------
+    dict
+    """
+    segmentation = segmentationNode.GetSegmentation()
+
+    name_to_ids = {}
+    for i in range(segmentation.GetNumberOfSegments()):
+        segment_id = segmentation.GetNthSegmentID(i)
+        name_to_ids.setdefault(segmentation.GetSegment(segment_id).GetName(), []).append(segment_id)
+
+    if all_ids:
+        return name_to_ids
+
+    return {name: ids[0] for name, ids in name_to_ids.items()}
+
 def segmentationNode(name='Segmentation'):
     '''
 
@@ -331,6 +430,185 @@ def segments_by_thresholding(segments_greyvalues, segmentationNode, segmentEdito
         effect.setParameter("MaximumThreshold",str(thresholdMax))
         effect.self().onApply()
 
+def segments_to_labelmap_array(segmentationNode, segment_names=None, referenceVolumeNode=None):
+    """
+    Export many segments into a single multi-label numpy array, without creating scene nodes.
+
+    Unlike `individual_segment_to_labelmapNode()`, which creates one labelmap node per segment,
+    the binary labelmap layers of the segmentation are read directly (one shared layer holds many
+    segments) and resampled at most once per layer.
+
+    Parameters
+    ----------
+    segmentationNode : vtkMRMLSegmentationNode
+        Segmentation to export.
+    segment_names : list of str, optional
+        Segments to export, labelled 1..N in this order. Default exports all segments.
+    referenceVolumeNode : vtkMRMLVolumeNode, optional
+        Output geometry. Default uses the segmentation's internal labelmap geometry,
+        cropped to the extent of the exported segments.
+
+    Returns
+    -------
+    labelmap_array : numpy.ndarray
+        Multi-label array indexed [k, j, i] as `slicer.util.arrayFromVolume()`.
+        Overlapping segments are labelled by the last one in `segment_names`.
+    label_values : dict
+        Segment name -> label value.
+    ijk_offset : tuple
+        (i, j, k) index of `labelmap_array[0, 0, 0]` in the output geometry.
+    ijkToRAS : numpy.ndarray
+        4x4 IJK to RAS matrix of the output geometry (segmentation coordinate system).
+    """
+    import numpy as np
+
+    layers, ijkToRAS, names = _segment_layer_arrays(segmentationNode, segment_names, referenceVolumeNode)
+    label_values = {name: value for value, name in enumerate(names, start=1)}
+    dtype = np.uint8 if len(names) < 2**8 else np.uint16 if len(names) < 2**16 else np.uint32
+
+    if referenceVolumeNode is not None:
+        extent = referenceVolumeNode.GetImageData().GetExtent()
+        ijk_min = np.array([extent[0], extent[2], extent[4]])
+        ijk_max = np.array([extent[1], extent[3], extent[5]])
+    elif layers:
+        ijk_min = np.min([offset for _, offset, _ in layers], axis=0)
+        ijk_max = np.max([np.add(offset, layer.shape[::-1]) - 1 for layer, offset, _ in layers], axis=0)
+    else:
+        ijk_min = ijk_max = np.array([0, 0, -1])
+
+    labelmap_array = np.zeros(tuple((ijk_max - ijk_min + 1)[::-1]), dtype=dtype)
+
+    for layer, offset, layer_segments in layers:
+        # Position of the layer in the output array, clipped to the output extent
+        start = np.maximum(np.asarray(offset), ijk_min)
+        stop = np.minimum(np.add(offset, layer.shape[::-1]), ijk_max + 1)
+        if np.any(stop <= start):
+            continue
+        src = tuple(slice(a - o, b - o) for a, b, o in zip(start[::-1], stop[::-1], offset[::-1]))
+        dst = tuple(slice(a - m, b - m) for a, b, m in zip(start[::-1], stop[::-1], ijk_min[::-1]))
+        layer = layer[src]
+        output = labelmap_array[dst]
+        for name, label in layer_segments:
+            output[layer == label] = label_values[name]
+
+    return labelmap_array, label_values, tuple(int(v) for v in ijk_min), ijkToRAS
+
+def segments_to_mask_arrays(segmentationNode, segment_names=None, referenceVolumeNode=None):
+    """
+    Export many segments into boolean arrays cropped to their bounding boxes, without creating scene nodes.
+
+    The bounding boxes of all the segments of a binary labelmap layer are found in a single pass
+    (`scipy.ndimage.find_objects`), so memory and time scale with the segmented voxels rather than
+    with the number of segments times the volume size.
+
+    Parameters
+    ----------
+    segmentationNode : vtkMRMLSegmentationNode
+        Segmentation to export.
+    segment_names : list of str, optional
+        Segments to export. Default exports all segments.
+    referenceVolumeNode : vtkMRMLVolumeNode, optional
+        Output geometry. Default uses the segmentation's internal labelmap geometry.
+
+    Returns
+    -------
+    masks : dict
+        Segment name -> (mask, ijk_offset), where `mask` is a boolean array indexed [k, j, i]
+        and `ijk_offset` the (i, j, k) index of `mask[0, 0, 0]` in the output geometry.
+        Empty segments get a (0, 0, 0) mask.
+    ijkToRAS : numpy.ndarray
+        4x4 IJK to RAS matrix of the output geometry (segmentation coordinate system).
+    """
+    import numpy as np
+    from scipy.ndimage import find_objects
+
+    layers, ijkToRAS, names = _segment_layer_arrays(segmentationNode, segment_names, referenceVolumeNode)
+
+    masks = {name: (np.zeros((0, 0, 0), dtype=bool), (0, 0, 0)) for name in names}
+
+    for layer, offset, layer_segments in layers:
+        bounding_boxes = find_objects(layer)
+        for name, label in layer_segments:
+            if label > len(bounding_boxes) or bounding_boxes[label - 1] is None:
+                continue
+            box = bounding_boxes[label - 1]
+            ijk_offset = tuple(int(o + sl.start) for o, sl in zip(offset, box[::-1]))
+            masks[name] = (layer[box] == label, ijk_offset)
+
+    return masks, ijkToRAS
+
+def _segment_layer_arrays(segmentationNode, segment_names=None, referenceVolumeNode=None):
+    """
+    Read the binary labelmap layers holding the requested segments as numpy arrays.
+
+    Returns the list of (layer_array, ijk_offset, [(segment_name, label_value), ...]),
+    the 4x4 IJK to RAS matrix shared by the layers, and the list of exported segment names.
+    """
+    import numpy as np
+    import vtk
+    from vtk.util.numpy_support import vtk_to_numpy
+
+    segmentation = segmentationNode.GetSegmentation()
+    binaryLabelmapName = slicer.vtkSegmentationConverter.GetBinaryLabelmapRepresentationName()
+    segmentation.CreateRepresentation(binaryLabelmapName)
+
+    name_to_id = segment_ids_by_name(segmentationNode)
+    if segment_names is None:
+        segment_names = list(name_to_id)
+    missing = [name for name in segment_names if name not in name_to_id]
+    if missing:
+        raise ValueError(f"Segments not found: {missing}")
+
+    # Group the requested segments by shared labelmap layer
+    layer_segments = {}
+    layer_images = {}
+    for name in segment_names:
+        segment = segmentation.GetSegment(name_to_id[name])
+        image = segment.GetRepresentation(binaryLabelmapName)
+        layer_segments.setdefault(id(image), []).append((name, segment.GetLabelValue()))
+        layer_images[id(image)] = image
+
+    def imageToWorldArray(image):
+        matrix = vtk.vtkMatrix4x4()
+        image.GetImageToWorldMatrix(matrix)
+        return slicer.util.arrayFromVTKMatrix(matrix)
+
+    referenceGeometry = None
+    ijkToRAS = np.eye(4)
+    if referenceVolumeNode is not None:
+        referenceGeometry = slicer.vtkOrientedImageData()
+        referenceGeometry.SetExtent(referenceVolumeNode.GetImageData().GetExtent())
+        ijkToRASMatrix = vtk.vtkMatrix4x4()
+        referenceVolumeNode.GetIJKToRASMatrix(ijkToRASMatrix)
+        referenceGeometry.SetImageToWorldMatrix(ijkToRASMatrix)
+        ijkToRAS = slicer.util.arrayFromVTKMatrix(ijkToRASMatrix)
+
+    layers = []
+    for key, image in layer_images.items():
+        resampled = False
+        if referenceGeometry is None:
+            # The first layer defines the output geometry
+            referenceGeometry = image
+            ijkToRAS = imageToWorldArray(image)
+        elif not np.allclose(imageToWorldArray(image), ijkToRAS):
+            resampledImage = slicer.vtkOrientedImageData()
+            slicer.vtkOrientedImageDataResample.ResampleOrientedImageToReferenceOrientedImage(image, referenceGeometry, resampledImage, False, False)
+            image = resampledImage
+            resampled = True
+
+        extent = image.GetExtent()
+        scalars = image.GetPointData().GetScalars()
+        if extent[1] < extent[0] or scalars is None:
+            continue
+        shape = (extent[5] - extent[4] + 1, extent[3] - extent[2] + 1, extent[1] - extent[0] + 1)
+        layer = vtk_to_numpy(scalars).reshape(shape)
+        if resampled:
+            # The resampled image is not owned by the segmentation
+            layer = layer.copy()
+        layers.append((layer, (extent[0], extent[2], extent[4]), layer_segments[key]))
+
+    return layers, ijkToRAS, list(segment_names)
+
 def segment_statistics(segmentationNode, masterVolumeNode=None, extra_keys=None):
     """
     Compute segment statistics with optional extra keys from the
@@ -378,20 +656,14 @@ def segment_statistics(segmentationNode, masterVolumeNode=None, extra_keys=None)
       
 def set_segments_color(segments_color, segmentationNode):
     '''
-    
+    Set the color of many segments, see ```bulk_edit_segments()```.
+
+    Args:
+        segments_color (dict): segment name -> (r, g, b) color in scale 0-1
+        segmentationNode (vtkMRMLSegmentationNode): segmentation node
     '''
     
-    segmentation = segmentationNode.GetSegmentation()
-    
-    for segmentName in segments_color:
-        
-        segmentID = segmentation.GetSegmentIdBySegmentName(segmentName)
-        segment = segmentation.GetSegment(segmentID)
-        
-        color = segments_color[segmentName]
-        segment.SetColor(color)
-        
-
+    bulk_edit_segments(segmentationNode, colors=segments_color)
         
 def split_islands(minimum_size, segment_name, segmentEditorNode, segmentEditorWidget):
     '''
@@ -0,0 +1,349 @@
+import numpy as np
+
+from pyslicer.histogram import volume_histogram
+
+def compute_thresholds(volumeNode, methods=None, bins=256, sample_size=None, sampling='random', seed=0):
+    '''
+    Compute several automatic thresholds of a volume from a single histogram.
+
+    Unlike ```pyslicer.segmentation.compute_threshold()```, which re-scans the whole volume for each method,
+    the histogram is built once (and cached until the image data is modified) and every method is evaluated on it.
+    Method names follow the vtkITKImageThresholdCalculator ones (e.g. 'otsu', 'iso_data', 'maximum_entropy').
+    Methods without a numpy implementation fall back to ```pyslicer.segmentation.compute_threshold()```.
+
+    Args:
+        volumeNode (slicer.vtkMRMLVolumeNode): Volume Node to threshold
+        methods (list): list of method names. Default None computes all methods in ```THRESHOLD_METHODS```.
+        bins (int): number of histogram bins the methods are evaluated on (256 as the ITK calculators). None keeps one bin per integer value,
+            which is also used for integer volumes spanning fewer values than ```bins```.
+        sample_size (int): number of sampled voxels used to build the histogram. Default None uses all voxels (exact for integer volumes).
+        sampling (str): 'random' or 'strided' voxel sampling, see ```pyslicer.histogram.array_histogram()```. Default 'random'.
+        seed (int): seed of the random voxel sampling. Default 0.
+
+    Returns:
+        thresholds (dict): threshold value for each method
+    '''
+
+    import slicer
+
+    if methods is None:
+        methods = list(THRESHOLD_METHODS)
+    elif isinstance(methods, str):
+        methods = [methods]
+
+    # Integer volumes spanning fewer values than bins get one bin per value, not a comb of empty bins
+    if bins is not None and np.issubdtype(slicer.util.arrayFromVolume(volumeNode).dtype, np.integer):
+        vmin, vmax = volumeNode.GetImageData().GetScalarRange()
+        if vmax - vmin + 1 <= bins:
+            bins = None
+
+    counts, bin_edges = volume_histogram(volumeNode, bins=bins, sample_size=sample_size, sampling=sampling, seed=seed)
+
+    if np.count_nonzero(counts) <= 1:
+        # Constant volume: every method returns its single intensity
+        value = float(np.nanmin(slicer.util.arrayFromVolume(volumeNode)))
+        return {method: value for method in methods}
+
+    numpy_methods = [m for m in methods if m.lower() in THRESHOLD_METHODS]
+    thresholds = thresholds_from_histogram(counts, bin_edges, methods=numpy_methods)
+
+    for method in methods:
+        if method.lower() not in THRESHOLD_METHODS:
+            from pyslicer.segmentation import compute_threshold
+            thresholds[method] = compute_threshold(method, volumeNode)
+
+    return thresholds
+
+def thresholds_from_histogram(counts, bin_edges, methods=None):
+    '''
+    Evaluate automatic thresholding methods on a precomputed histogram.
+
+    Degenerate histograms, with a single occupied bin, give the center of that bin for every method,
+    as the SimpleITK filters return the single intensity of a constant image.
+
+    Args:
+        counts (numpy.ndarray): histogram counts, as returned by numpy.histogram()
+        bin_edges (numpy.ndarray): histogram bin edges, as returned by numpy.histogram()
+        methods (list): list of method names among ```THRESHOLD_METHODS```. Default None computes all of them.
+
+    Returns:
+        thresholds (dict): threshold value (in intensity units) for each method
+    '''
+
+    if methods is None:
+        methods = list(THRESHOLD_METHODS)
+
+    counts = np.asarray(counts, dtype=float)
+    bin_edges = np.asarray(bin_edges, dtype=float)
+    bin_centers = 0.5 * (bin_edges[:-1] + bin_edges[1:])
+
+    thresholds = {}
+    for method in methods:
+        key = method.lower()
+        if key not in THRESHOLD_METHODS:
+            raise ValueError(f"Unknown threshold method '{method}'. Choose among {list(THRESHOLD_METHODS)}")
+        thresholds[method] = THRESHOLD_METHODS[key](counts, bin_centers)
+
+    return thresholds
+
+def _degenerate_guard(method):
+    '''
+    Make a threshold method return the single intensity of a histogram with at most one occupied bin, instead of raising or returning nan.
+    '''
+
+    from functools import wraps
+
+    @wraps(method)
+    def guarded(counts, bin_centers, *args, **kwargs):
+        nonzero = np.flatnonzero(counts)
+        if len(nonzero) <= 1:
+            return bin_centers[nonzero[0]] if len(nonzero) else bin_centers[len(bin_centers) // 2]
+        return method(counts, bin_centers, *args, **kwargs)
+
+    return guarded
+
+@_degenerate_guard
+def threshold_huang(counts, bin_centers):
+    '''
+    Huang's fuzzy thresholding method, minimizing the Shannon entropy of the fuzzy membership.
+    '''
+
+    nonzero = np.flatnonzero(counts)
+    first, last = nonzero[0], nonzero[-1]
+    if first == last:
+        return bin_centers[first]
+
+    h = counts[first:last + 1]
+    idx = np.arange(first, last + 1, dtype=float)
+    term = 1.0 / (last - first)
+
+    csum = np.cumsum(h)
+    cidx = np.cumsum(h * idx)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mu_0 = cidx / csum
+        mu_1 = (cidx[-1] - cidx) / (csum[-1] - csum)
+
+    def shannon(mu):
+        mu = np.clip(mu, 1e-12, 1 - 1e-12)
+        return -mu * np.log(mu) - (1 - mu) * np.log(1 - mu)
+
+    entropies = np.full(len(h), np.inf)
+    for it in range(len(h) - 1):
+        below = shannon(1.0 / (1.0 + term * np.abs(idx[:it + 1] - mu_0[it])))
+        above = shannon(1.0 / (1.0 + term * np.abs(idx[it + 1:] - mu_1[it])))
+        entropies[it] = np.dot(below, h[:it + 1]) + np.dot(above, h[it + 1:])
+
+    return bin_centers[first + np.argmin(entropies)]
+
+@_degenerate_guard
+def threshold_intermodes(counts, bin_centers, max_iterations=10000):
+    '''
+    Intermodes method: the histogram is smoothed until bimodal and the threshold is the midpoint of the two peaks.
+    If it never becomes bimodal, the middle of the occupied intensity range is returned.
+    '''
+
+    h = counts.astype(float)
+    for _ in range(max_iterations):
+        maxima = np.flatnonzero((h[1:-1] > h[:-2]) & (h[1:-1] > h[2:])) + 1
+        if len(maxima) == 2:
+            return bin_centers[int(np.floor(maxima.mean()))]
+        # Three-point running mean, as in ImageJ
+        padded = np.concatenate(([0.0], h, [0.0]))
+        h = (padded[:-2] + padded[1:-1] + padded[2:]) / 3
+
+    # Never bimodal (e.g. two adjacent occupied bins): middle of the occupied range, as the ITK calculator falls back to
+    nonzero = np.flatnonzero(counts)
+    return bin_centers[(nonzero[0] + nonzero[-1]) // 2]
+
+@_degenerate_guard
+def threshold_iso_data(counts, bin_centers):
+    '''
+    IsoData (iterative intermeans) method: the threshold equals the average of the means below and above it.
+    '''
+
+    csum = np.cumsum(counts)
+    cint = np.cumsum(counts * bin_centers)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        low = cint[:-1] / csum[:-1]
+        high = (cint[-1] - cint[:-1]) / (csum[-1] - csum[:-1])
+    all_mean = (low + high) / 2
+
+    bin_width = bin_centers[1] - bin_centers[0]
+    distances = all_mean - bin_centers[:-1]
+    candidates = np.flatnonzero((distances >= 0) & (distances < bin_width))
+
+    if len(candidates) == 0:
+        return bin_centers[np.nanargmin(np.abs(distances))]
+
+    return bin_centers[candidates[0]]
+
+@_degenerate_guard
+def threshold_kittler_illingworth(counts, bin_centers):
+    '''
+    Kittler-Illingworth minimum error thresholding, fitting two Gaussians to the histogram.
+    '''
+
+    p = counts / counts.sum()
+    P1 = np.cumsum(p)[:-1]
+    P2 = 1 - P1
+    m1 = np.cumsum(p * bin_centers)[:-1]
+    s1 = np.cumsum(p * bin_centers ** 2)[:-1]
+    total_m, total_s = np.sum(p * bin_centers), np.sum(p * bin_centers ** 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mu1, mu2 = m1 / P1, (total_m - m1) / P2
+        var1 = s1 / P1 - mu1 ** 2
+        var2 = (total_s - s1) / P2 - mu2 ** 2
+        J = 1 + P1 * np.log(var1) + P2 * np.log(var2) - 2 * (P1 * np.log(P1) + P2 * np.log(P2))
+
+    J[~np.isfinite(J) | (var1 <= 0) | (var2 <= 0)] = np.inf
+
+    return bin_centers[np.argmin(J)]
+
+@_degenerate_guard
+def threshold_li(counts, bin_centers, tolerance=None):
+    '''
+    Li's iterative minimum cross entropy method.
+    '''
+
+    offset = bin_centers[0]
+    x = bin_centers - offset
+    if tolerance is None:
+        tolerance = (bin_centers[1] - bin_centers[0]) / 2
+
+    total = counts.sum()
+    t_next = np.dot(counts, x) / total
+    t_curr = -2 * tolerance
+    while abs(t_next - t_curr) > tolerance:
+        t_curr = t_next
+        foreground = x > t_curr
+        if not foreground.any() or foreground.all():
+            break
+        mean_fore = np.dot(counts[foreground], x[foreground]) / counts[foreground].sum()
+        mean_back = np.dot(counts[~foreground], x[~foreground]) / counts[~foreground].sum()
+        if mean_back == 0:
+            break
+        t_next = (mean_back - mean_fore) / (np.log(mean_back) - np.log(mean_fore))
+
+    return t_next + offset
+
+@_degenerate_guard
+def threshold_maximum_entropy(counts, bin_centers):
+    '''
+    Kapur-Sahoo-Wong maximum entropy method.
+    '''
+
+    p = counts / counts.sum()
+    plogp = np.where(p > 0, p * np.log(np.where(p > 0, p, 1)), 0)
+    P = np.cumsum(p)[:-1]
+    S = np.cumsum(plogp)[:-1]
+    S_total = plogp.sum()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy_back = np.log(P) - S / P
+        entropy_fore = np.log(1 - P) - (S_total - S) / (1 - P)
+    total_entropy = entropy_back + entropy_fore
+    total_entropy[~np.isfinite(total_entropy)] = -np.inf
+
+    return bin_centers[np.argmax(total_entropy)]
+
+@_degenerate_guard
+def threshold_moments(counts, bin_centers):
+    '''
+    Tsai's moment-preserving thresholding method.
+    '''
+
+    p = counts / counts.sum()
+    idx = np.arange(len(p), dtype=float)
+    m1, m2, m3 = np.dot(p, idx), np.dot(p, idx ** 2), np.dot(p, idx ** 3)
+
+    cd = m2 - m1 * m1
+    c0 = (-m2 * m2 + m1 * m3) / cd
+    c1 = (m1 * m2 - m3) / cd
+    z0 = 0.5 * (-c1 - np.sqrt(c1 * c1 - 4 * c0))
+    z1 = 0.5 * (-c1 + np.sqrt(c1 * c1 - 4 * c0))
+    p0 = (z1 - m1) / (z1 - z0)
+
+    # Gray level closest to the p0-tile of the normalized histogram
+    return bin_centers[min(np.searchsorted(np.cumsum(p), p0, side='right'), len(p) - 1)]
+
+@_degenerate_guard
+def threshold_otsu(counts, bin_centers):
+    '''
+    Otsu's method, maximizing the between-class variance.
+    '''
+
+    p = counts / counts.sum()
+    w0 = np.cumsum(p)[:-1]
+    mu = np.cumsum(p * bin_centers)[:-1]
+    mu_total = np.dot(p, bin_centers)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance_between = (mu_total * w0 - mu) ** 2 / (w0 * (1 - w0))
+    variance_between[~np.isfinite(variance_between)] = -np.inf
+
+    return bin_centers[np.argmax(variance_between)]
+
+@_degenerate_guard
+def threshold_triangle(counts, bin_centers):
+    '''
+    Zack's triangle method, suited to histograms with a single dominant peak.
+    '''
+
+    nbins = len(counts)
+    arg_peak = int(np.argmax(counts))
+    peak_height = counts[arg_peak]
+    arg_low, arg_high = np.flatnonzero(counts)[[0, -1]]
+
+    # Use the longest tail of the histogram
+    flip = arg_peak - arg_low < arg_high - arg_peak
+    h = counts
+    if flip:
+        h = counts[::-1]
+        arg_low = nbins - arg_high - 1
+        arg_peak = nbins - arg_peak - 1
+
+    width = arg_peak - arg_low
+    if width == 0:
+        return bin_centers[arg_peak]
+
+    x1 = np.arange(width)
+    y1 = h[x1 + arg_low]
+    norm = np.sqrt(peak_height ** 2 + width ** 2)
+    length = (peak_height / norm) * x1 - (width / norm) * y1
+    arg_level = int(np.argmax(length)) + arg_low
+
+    if flip:
+        arg_level = nbins - arg_level - 1
+
+    return bin_centers[arg_level]
+
+@_degenerate_guard
+def threshold_yen(counts, bin_centers):
+    '''
+    Yen's maximum correlation criterion.
+    '''
+
+    p = counts / counts.sum()
+    P1 = np.cumsum(p)
+    P1_sq = np.cumsum(p ** 2)
+    P2_sq = np.cumsum(p[::-1] ** 2)[::-1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        criterion = np.log(((P1_sq[:-1] * P2_sq[1:]) ** -1) * (P1[:-1] * (1.0 - P1[:-1])) ** 2)
+    criterion[~np.isfinite(criterion)] = -np.inf
+
+    return bin_centers[np.argmax(criterion)]
+
+THRESHOLD_METHODS = {
+    'huang': threshold_huang,
+    'intermodes': threshold_intermodes,
+    'iso_data': threshold_iso_data,
+    'kittler_illingworth': threshold_kittler_illingworth,
+    'li': threshold_li,
+    'maximum_entropy': threshold_maximum_entropy,
+    'moments': threshold_moments,
+    'otsu': threshold_otsu,
+    'triangle': threshold_triangle,
+    'yen': threshold_yen,
+}
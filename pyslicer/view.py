@@ -2,31 +2,112 @@ import slicer
 import numpy as np
 import os
 
-def create_rotation_video(output_video_path, rotation_degrees=360, steps=180, fps=30, resolution=(1280, 720)):
+def create_camera_path_video(output_video_path, keyframes, steps=60, fps=30, resolution=(1280, 720), encoder='auto', codec='libx264', crf=18, queue_size=8, offscreen=None):
+    """
+    Creates a video flying the camera through keyframe poses.
+
+    The camera is interpolated between the keyframes with ```interpolate_camera_poses()``` (quaternion slerp of the
+    orientation). Frames are streamed as raw BGR data through a pipe to an ffmpeg process, which encodes them on other
+    cores, or written with OpenCV if ffmpeg is not available. Poses are generated lazily and frame buffers are recycled,
+    so long fly-throughs render at constant memory.
+
+    Args:
+        output_video_path (Path): The path where the output video will be saved.
+        keyframes (list): camera poses, as accepted by ```render_poses()``` (e.g. ```get_camera_3Dview()``` outputs or CSV files).
+        steps (int or list, optional): The number of frames between consecutive keyframes, one for all or one per segment. Defaults to 60.
+        fps (int, optional): The frames per second. Defaults to 30.
+        resolution (tuple, optional): The width and height of the video. Defaults to (1280, 720).
+        encoder (str, optional): 'ffmpeg', 'opencv', or 'auto' to use ffmpeg if found on the PATH. Defaults to 'auto'.
+        codec (str, optional): The ffmpeg video codec. Defaults to 'libx264'.
+        crf (int, optional): The ffmpeg constant rate factor (quality, lower is better). Defaults to 18.
+        queue_size (int, optional): The number of frames waiting to be encoded. Defaults to 8.
+        offscreen (OffscreenView, optional): Render into this offscreen view instead of the 3D view window.
+    """
 
-    import cv2
     import vtk
+    from pyslicer.lod import full_resolution
+
+    if offscreen is None:
+        three_d_view = slicer.app.layoutManager().threeDWidget(0).threeDView()
+        camera = three_d_view.cameraNode()
+        wti = vtk.vtkWindowToImageFilter()
+        wti.SetInput(three_d_view.renderWindow())
+        wti.SetInputBufferTypeToRGB()
+        wti.ReadFrontBufferOff()
+        convert = _FrameConverter(resolution)
+        slicer.app.processEvents()
+    else:
+        # Restored afterwards, the offscreen view may be used for other figures
+        previous_resolution = offscreen.resolution
+
+    video_writer = _open_video_writer(output_video_path, fps, resolution, encoder=encoder, codec=codec, crf=crf)
+    frames = _FrameQueue(video_writer.write, (resolution[1], resolution[0], 3), size=queue_size)
 
+    try:
+        # Models with a level-of-detail pyramid are rendered at full resolution
+        with full_resolution():
+            if offscreen is not None:
+                offscreen.set_resolution(resolution)
+                offscreen.sync(camera=False)
+                camera = offscreen.camera
+
+            for pose in interpolate_camera_poses(keyframes, steps=steps):
+                _apply_camera_pose(camera, pose)
+                frame = frames.get_buffer()
+
+                if offscreen is not None:
+                    offscreen.render(out=frame, bgr=True)
+                else:
+                    camera.ResetClippingRange()
+                    wti.Modified()
+                    wti.Update()
+                    convert(wti.GetOutput(), frame)
+
+                frames.put(frame)
+    finally:
+        try:
+            frames.close()
+        finally:
+            video_writer.release()
+            if offscreen is not None:
+                offscreen.set_resolution(previous_resolution)
+
+    print("Video saved to:", output_video_path)
+
+def create_rotation_video(output_video_path, rotation_degrees=360, steps=180, fps=30, resolution=(1280, 720), queue_size=8, offscreen=None, encoder='opencv'):
     """
     Creates a rotation video of a 3D model.
 
+    Frames are captured with a single vtkWindowToImageFilter, flipped, converted to BGR and resized in one pass into
+    reusable buffers, and encoded by a writer thread fed through a bounded queue, so rendering and encoding overlap.
+
     Args:
         output_video_path (Path): The path where the output video will be saved.
         rotation_degrees (int, optional): The total rotation in degrees. Defaults to 360.
         steps (int, optional): The number of frames. Defaults to 180.
         fps (int, optional): The frames per second. Defaults to 30.
         resolution (tuple, optional): The width and height of the video. Defaults to (1280, 720).
+        queue_size (int, optional): The number of frames waiting to be encoded. Defaults to 8.
+        offscreen (OffscreenView, optional): Render into this offscreen view, at the video resolution, instead of the 3D view window.
+        encoder (str, optional): 'opencv' (mp4v), 'ffmpeg' (H.264 through a pipe) or 'auto', see ```create_camera_path_video()```. Defaults to 'opencv'.
     """
 
+    import vtk
+    from pyslicer.lod import full_resolution
+
     # -------------------------
     # SETUP 3D VIEW
     # -------------------------
-    layout_manager = slicer.app.layoutManager()
-    three_d_widget = layout_manager.threeDWidget(0)
-    three_d_view = three_d_widget.threeDView()
-    render_window = three_d_view.renderWindow()
+    if offscreen is None:
+        layout_manager = slicer.app.layoutManager()
+        three_d_widget = layout_manager.threeDWidget(0)
+        three_d_view = three_d_widget.threeDView()
+        render_window = three_d_view.renderWindow()
 
-    camera = three_d_view.cameraNode().GetCamera()
+        camera = three_d_view.cameraNode().GetCamera()
+    else:
+        # Restored afterwards, the offscreen view may be used for other figures
+        previous_resolution = offscreen.resolution
 
     ## Reset camera to nicely frame the model
     #three_d_view.resetFocalPoint()
@@ -36,59 +117,75 @@ def create_rotation_video(output_video_path, rotation_degrees=360, steps=180, fp
     # -------------------------
     # VIDEO WRITER
     # -------------------------
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    video_writer = cv2.VideoWriter(
-        output_video_path,
-        fourcc,
-        fps,
-        resolution
-    )
+    video_writer = _open_video_writer(output_video_path, fps, resolution, encoder=encoder)
+    frames = _FrameQueue(video_writer.write, (resolution[1], resolution[0], 3), size=queue_size)
 
     # -------------------------
     # ROTATION + CAPTURE
     # -------------------------
-    angle_step = rotation_degrees / steps
+    if offscreen is None:
+        wti = vtk.vtkWindowToImageFilter()
+        wti.SetInput(render_window)
+        wti.SetInputBufferTypeToRGB()
+        wti.ReadFrontBufferOff()
+        # Each frame is rendered explicitly, the filter only reads it back
+        wti.ShouldRerenderOff()
+        convert = _FrameConverter(resolution)
 
-    for i in range(steps):
-        camera.Azimuth(angle_step)
-        render_window.Render()
+        # Flush pending layout changes once, the frames are then rendered synchronously
         slicer.app.processEvents()
 
-        # Capture image from render window
-        wti = vtk.vtkWindowToImageFilter()
-        wti.SetInput(render_window)
-        wti.Update()
+    angle_step = rotation_degrees / steps
 
-        vtk_image = wti.GetOutput()
-        width, height, _ = vtk_image.GetDimensions()
+    # Models with a level-of-detail pyramid are rendered at full resolution
+    try:
+        with full_resolution():
+            if offscreen is not None:
+                offscreen.set_resolution(resolution)
+                offscreen.sync()
+                camera = offscreen.camera
 
-        vtk_array = vtk_image.GetPointData().GetScalars()
-        components = vtk_array.GetNumberOfComponents()
-        image = np.frombuffer(vtk_array, dtype=np.uint8)
-        image = image.reshape(height, width, components)
+            for i in range(steps):
+                camera.Azimuth(angle_step)
+                frame = frames.get_buffer()
 
-        # Convert RGB → BGR
-        frame = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+                if offscreen is not None:
+                    offscreen.render(out=frame, bgr=True)
+                else:
+                    render_window.Render()
 
-        # FIX: flip vertically (VTK bottom-left → OpenCV top-left)
-        frame = np.flipud(frame)
+                    # Capture image from render window
+                    wti.Modified()
+                    wti.Update()
+                    convert(wti.GetOutput(), frame)
 
-        # Resize and write
-        frame = cv2.resize(frame, resolution)
-        video_writer.write(frame)
+                frames.put(frame)
+    finally:
+        # -------------------------
+        # CLEANUP
+        # -------------------------
+        try:
+            frames.close()
+        finally:
+            video_writer.release()
+            if offscreen is not None:
+                offscreen.set_resolution(previous_resolution)
 
-    # -------------------------
-    # CLEANUP
-    # -------------------------
-    video_writer.release()
     print("Video saved to:", output_video_path)
 
-def default_dark_3D_view():
+def default_dark_3D_view(offscreen=None):
+    color = (28/255, 29/255, 36/255)
+
+    if offscreen is not None:
+        # The offscreen view has its own resolution and no cube, labels or ruler
+        offscreen.background = color
+        offscreen.sync(camera=False)
+        return
+
     set_windowsize(x=1980,y=1080)
     
     show_cube_labels(False)
     
-    color = (28/255, 29/255, 36/255)
     set_background_color(color)
 
     # Set thick and white ruler
@@ -156,6 +253,192 @@ def get_camera_3Dview(use_pandas=False, save_csv=False, csv_path="camera_view.cs
 
     return data
 
+def interpolate_camera_poses(keyframes, steps=60):
+    """
+    Interpolate camera poses between keyframes, yielding one pose per frame.
+
+    The orientation of the camera (view direction and view up) is interpolated with quaternion slerp, and the focal point,
+    the distance to it, the view angle and the parallel scale linearly, so the camera turns smoothly around the scene.
+
+    Args:
+        keyframes (list): at least two camera poses, as accepted by ```render_poses()```
+        steps (int or list): The number of frames between consecutive keyframes, one for all or one per segment; a segment
+            of 0 steps cuts to its last keyframe. Defaults to 60.
+
+    Yields:
+        pose (dict): 'position', 'focalPoint', 'viewUp', 'viewAngle' and 'parallelScale' of each frame, the last keyframe included
+    """
+
+    from scipy.spatial.transform import Rotation, Slerp
+
+    poses = [pose for _, pose in _camera_poses(keyframes)]
+    if len(poses) < 2:
+        raise ValueError("At least two keyframes are required")
+
+    steps = np.broadcast_to(np.asarray(steps, dtype=int), (len(poses) - 1,))
+    if (steps < 0).any():
+        raise ValueError("steps must be positive")
+
+    # Zero-length segments (e.g. between repeated keyframes) are skipped, cutting to their last keyframe
+    poses = [pose for pose, step in zip(poses, steps) if step > 0] + [poses[-1]]
+    steps = steps[steps > 0]
+    n_frames = steps.sum() + 1
+    if len(poses) < 2:
+        # A single pose: slerp still needs two keyframes
+        poses, steps = [poses[0], poses[0]], np.ones(1, dtype=int)
+
+    times = np.concatenate(([0], np.cumsum(steps)))
+
+    focal_points = np.array([pose['focalPoint'] for pose in poses], dtype=float)
+    positions = np.array([pose['position'] for pose in poses], dtype=float)
+    distances = np.linalg.norm(positions - focal_points, axis=1)
+
+    # Camera frames: columns are the right, up and backward (focal point → position) directions
+    matrices = []
+    for position, focal_point, distance, pose in zip(positions, focal_points, distances, poses):
+        backward = (position - focal_point) / distance
+        up = np.asarray(pose['viewUp'], dtype=float)
+        up = up - np.dot(up, backward) * backward
+        up /= np.linalg.norm(up)
+        matrices.append(np.column_stack((np.cross(up, backward), up, backward)))
+    slerp = Slerp(times, Rotation.from_matrix(matrices))
+
+    def lerp(key, segment, t):
+        a, b = poses[segment].get(key), poses[segment + 1].get(key)
+        if a is None or b is None:
+            return a if b is None else b
+        return (1 - t) * a + t * b
+
+    for frame in range(n_frames):
+        segment = min(np.searchsorted(times, frame, side='right') - 1, len(poses) - 2)
+        t = (frame - times[segment]) / max(steps[segment], 1)
+
+        rotation = slerp([frame]).as_matrix()[0]
+        focal_point = (1 - t) * focal_points[segment] + t * focal_points[segment + 1]
+        distance = (1 - t) * distances[segment] + t * distances[segment + 1]
+
+        yield {
+            'position': focal_point + distance * rotation[:, 2],
+            'focalPoint': focal_point,
+            'viewUp': rotation[:, 1],
+            'viewAngle': lerp('viewAngle', segment, t),
+            'parallelScale': lerp('parallelScale', segment, t),
+        }
+
+def render_poses(poses, output_pattern, scenes=None, workers=4, offscreen=None, resolution=None, max_pending=None):
+    """
+    Render images of saved camera poses, for one or several scenes, encoding and writing them in a thread pool.
+
+    The poses are rendered back to back with a single capture filter (or an ```OffscreenView```), and each image is
+    handed to a pool of ```workers``` threads writing it with OpenCV, so rendering and image encoding overlap.
+
+    Example usage:
+        render_poses(['front.csv', 'side.csv'], 'figures/{scene}_{pose}.png', scenes=['specimen1.mrb', 'specimen2.mrb'])
+
+    Args:
+        poses (list or str): camera poses, each as returned by ```get_camera_3Dview()``` (list of rows or DataFrame),
+            a dict with 'position', 'focalPoint', 'viewUp' (and optionally 'viewAngle', 'parallelScale') vectors,
+            or the path of a CSV saved by ```get_camera_3Dview(save_csv=True)```. A single CSV path may hold several poses.
+        output_pattern (str): output file pattern with the {scene} and {pose} fields, e.g. 'views/{scene}_{pose:02d}.png'.
+            {pose} is the pose index, or the CSV file name for poses given as CSV files.
+        scenes (list, optional): scene files (e.g. .mrb) loaded one after the other, or callables preparing the scene,
+            all rendered with every pose. Defaults to the current scene.
+        workers (int, optional): The number of image writing threads. Defaults to 4.
+        offscreen (OffscreenView, optional): Render into this offscreen view instead of the 3D view window.
+        resolution (tuple, optional): The width and height of the images, resized from the 3D view size if given.
+            Defaults to the size of the 3D view (or of the offscreen view).
+        max_pending (int, optional): The maximum number of images waiting to be written. Defaults to 2 * workers.
+
+    Returns:
+        output_files (list): paths of the written images
+    """
+
+    import cv2
+    import vtk
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    from pathlib import Path
+    from pyslicer.lod import full_resolution
+
+    named_poses = _camera_poses(poses)
+    if scenes is None:
+        scenes = [None]
+    if max_pending is None:
+        max_pending = 2 * workers
+
+    if offscreen is None:
+        three_d_view = slicer.app.layoutManager().threeDWidget(0).threeDView()
+        wti = vtk.vtkWindowToImageFilter()
+        wti.SetInput(three_d_view.renderWindow())
+        wti.SetInputBufferTypeToRGB()
+        wti.ReadFrontBufferOff()
+        convert = _FrameConverter(resolution)
+    else:
+        # Restored afterwards, the offscreen view may be used for other figures
+        previous_resolution = offscreen.resolution
+        camera = offscreen.camera
+
+    def write(outputfile, image):
+        os.makedirs(os.path.dirname(os.path.abspath(outputfile)), exist_ok=True)
+        if not cv2.imwrite(outputfile, image):
+            raise IOError(f"Could not write {outputfile}")
+        return outputfile
+
+    output_files = []
+    pending = deque()
+    try:
+        if offscreen is not None and resolution is not None:
+            offscreen.set_resolution(resolution)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for scene_index, scene in enumerate(scenes):
+                scene_name = scene_index
+                if isinstance(scene, (str, Path)):
+                    scene_name = Path(scene).name.split('.')[0]
+                    slicer.mrmlScene.Clear(0)
+                    slicer.util.loadScene(str(scene))
+                elif callable(scene):
+                    scene(scene_index)
+
+                if offscreen is None:
+                    # Loading a scene replaces the view's camera node
+                    camera = three_d_view.cameraNode()
+
+                # Models with a level-of-detail pyramid are rendered at full resolution
+                with full_resolution():
+                    if offscreen is not None:
+                        offscreen.sync(camera=False)
+                    else:
+                        slicer.app.processEvents()
+
+                    for pose_name, pose in named_poses:
+                        _apply_camera_pose(camera, pose)
+
+                        if offscreen is not None:
+                            image = offscreen.render(bgr=True)
+                        else:
+                            camera.ResetClippingRange()
+                            wti.Modified()
+                            wti.Update()
+                            frame = wti.GetOutput()
+                            width, height = resolution if resolution is not None else frame.GetDimensions()[:2]
+                            image = convert(frame, np.empty((height, width, 3), dtype=np.uint8))
+
+                        outputfile = output_pattern.format(scene=scene_name, pose=pose_name)
+                        pending.append(executor.submit(write, outputfile, image))
+
+                        # Bounded number of images in memory
+                        while len(pending) >= max_pending:
+                            output_files.append(pending.popleft().result())
+
+            while pending:
+                output_files.append(pending.popleft().result())
+    finally:
+        if offscreen is not None:
+            offscreen.set_resolution(previous_resolution)
+
+    return output_files
+
 def reset_camera_to_fit_all_visible_models():
     """
     Reset camera to fit all visible models in the 3D view.
@@ -174,11 +457,21 @@ def reset_camera_to_fit_all_visible_models():
 
     threeDView.forceRender()
 
-def screenshot_3Dview(outputfile):
-    import ScreenCapture
-    cap = ScreenCapture.ScreenCaptureLogic()
-    view = slicer.app.layoutManager().threeDWidget(0).threeDView()
-    cap.captureImageFromView(view, outputfile)
+def screenshot_3Dview(outputfile, offscreen=None):
+    from pyslicer.lod import full_resolution
+    # Models with a level-of-detail pyramid are captured at full resolution
+    with full_resolution():
+        if offscreen is not None:
+            # Rendered at the offscreen view resolution, with the current 3D view camera
+            offscreen.sync()
+            offscreen.screenshot(outputfile)
+            return
+
+        import ScreenCapture
+        cap = ScreenCapture.ScreenCaptureLogic()
+        view = slicer.app.layoutManager().threeDWidget(0).threeDView()
+        view.forceRender()
+        cap.captureImageFromView(view, outputfile)
 
 
 def set_background_color(color):
@@ -246,4 +539,488 @@ def show_ruler(thickness=2, color=0):
     
     # Set thick and white ruler
     viewNode.SetRulerType(thickness) # 2 - thick
-    viewNode.SetRulerColor(color) # 0 - white
\ No newline at end of file
+    viewNode.SetRulerColor(color) # 0 - white
+
+class OffscreenView:
+    """
+    Offscreen rendering context of the 3D scene, independent of the GUI window.
+
+    Visible model nodes and segments (closed surface representation, with each segment's color and 3D opacity) are
+    rendered with their display properties (color, opacity, lighting, scalars) and linear parent transforms into an offscreen framebuffer of any resolution, optionally supersampled: the scene is rendered
+    ```supersampling``` times larger and averaged down. Rendering is synchronous, so neither the main window size nor
+    ```slicer.app.processEvents()``` are involved and it also runs without a main window (e.g. ```Slicer --no-main-window```
+    with an offscreen-capable VTK build). Other displayable nodes (markups, volume rendering, ...) are not rendered,
+    and a warning is logged for each visible one.
+
+    Example usage:
+        offscreen = OffscreenView(resolution=(3840, 2160), supersampling=2)
+        screenshot_3Dview('figure.png', offscreen=offscreen)
+        create_rotation_video('turntable.mp4', offscreen=offscreen)
+
+    Args:
+        resolution (tuple): width and height of the output images. Default is (1920, 1080)
+        supersampling (int): rendering scale factor averaged down to the output resolution. Default is 1
+        background (tuple): RGB background color in scale 0-1. Default None uses the 3D view background, if any
+    """
+
+    def __init__(self, resolution=(1920, 1080), supersampling=1, background=None):
+        import vtk
+
+        self.supersampling = int(supersampling)
+        self.background = background
+        self.actors = {}
+        # IDs of the visible nodes that cannot be rendered, warned about once
+        self.skipped = set()
+
+        self.renderer = vtk.vtkRenderer()
+        self.renderer.SetUseDepthPeeling(True)
+        self.renderer.SetMaximumNumberOfPeels(8)
+        vtk.vtkLightKit().AddLightsToRenderer(self.renderer)
+
+        self.render_window = vtk.vtkRenderWindow()
+        self.render_window.SetOffScreenRendering(True)
+        self.render_window.SetAlphaBitPlanes(True)
+        self.render_window.SetMultiSamples(0)
+        self.render_window.AddRenderer(self.renderer)
+
+        self.capture = vtk.vtkWindowToImageFilter()
+        self.capture.SetInput(self.render_window)
+        self.capture.SetInputBufferTypeToRGB()
+        self.capture.ReadFrontBufferOff()
+        # render() renders explicitly, the filter only reads the framebuffer back
+        self.capture.ShouldRerenderOff()
+
+        self.set_resolution(resolution)
+        self.sync(reset_camera=True)
+
+    @property
+    def camera(self):
+        """vtkCamera of the offscreen view, e.g. to ```Azimuth()``` it without moving the GUI camera."""
+        return self.renderer.GetActiveCamera()
+
+    def set_resolution(self, resolution):
+        self.resolution = tuple(int(x) for x in resolution)
+        self.render_window.SetSize(self.resolution[0] * self.supersampling, self.resolution[1] * self.supersampling)
+
+    def sync(self, camera=True, reset_camera=False):
+        """
+        Update the rendered models and segments, their display properties and the background from the scene.
+
+        Args:
+            camera (bool): copy the camera of the 3D view, if there is one. Default is True
+            reset_camera (bool): frame all models if there is no 3D view camera to copy. Default is False
+        """
+
+        import logging
+
+        visible = set()
+        rendered_nodes = set()
+        for modelNode in slicer.util.getNodesByClass('vtkMRMLModelNode'):
+            displayNode = modelNode.GetDisplayNode()
+            if modelNode.GetHideFromEditors():
+                # e.g. slice plane models
+                rendered_nodes.add(modelNode.GetID())
+                continue
+            if not _visible_3D(displayNode) or modelNode.GetPolyData() is None:
+                continue
+            rendered_nodes.add(modelNode.GetID())
+            visible.add(modelNode.GetID())
+
+            # Follows the polydata the node holds, e.g. the displayed level of detail
+            actor = self._actor(modelNode.GetID(), modelNode.GetPolyDataConnection(), displayNode, modelNode.GetParentTransformNode())
+            self._set_scalars(actor.GetMapper(), displayNode)
+
+        for segmentationNode in slicer.util.getNodesByClass('vtkMRMLSegmentationNode'):
+            displayNode = segmentationNode.GetDisplayNode()
+            rendered_nodes.add(segmentationNode.GetID())
+            if not _visible_3D(displayNode):
+                continue
+
+            segmentation = segmentationNode.GetSegmentation()
+            if not segmentation.ContainsRepresentation(slicer.vtkSegmentationConverter.GetSegmentationClosedSurfaceRepresentationName()):
+                # As "Show 3D" in the Segmentations module
+                segmentationNode.CreateClosedSurfaceRepresentation()
+
+            for segmentID in segmentation.GetSegmentIDs():
+                if not displayNode.GetSegmentVisibility(segmentID) or not displayNode.GetSegmentVisibility3D(segmentID):
+                    continue
+                polyData = segmentationNode.GetClosedSurfaceInternalRepresentation(segmentID)
+                if polyData is None or polyData.GetNumberOfPoints() == 0:
+                    continue
+                key = f"{segmentationNode.GetID()}/{segmentID}"
+                visible.add(key)
+
+                actor = self._actor(key, polyData, displayNode, segmentationNode.GetParentTransformNode())
+                actor.GetMapper().ScalarVisibilityOff()
+                actor.GetProperty().SetColor(segmentation.GetSegment(segmentID).GetColor())
+                actor.GetProperty().SetOpacity(displayNode.GetOpacity3D() * displayNode.GetSegmentOpacity3D(segmentID))
+
+        # Other displayable nodes (markups, volume rendering, ...) are not rendered
+        for node in slicer.util.getNodesByClass('vtkMRMLDisplayableNode'):
+            if node.GetID() in rendered_nodes or node.GetID() in self.skipped or node.GetHideFromEditors():
+                continue
+            for index in range(node.GetNumberOfDisplayNodes()):
+                displayNode = node.GetNthDisplayNode(index)
+                if _visible_3D(displayNode) and not displayNode.IsA('vtkMRMLVolumeDisplayNode'):
+                    logging.warning(f"OffscreenView does not render {node.GetName()} ({node.GetClassName()})")
+                    self.skipped.add(node.GetID())
+                    break
+
+        for nodeID in set(self.actors) - visible:
+            self.renderer.RemoveActor(self.actors.pop(nodeID))
+
+        threeDView = None
+        if slicer.app.layoutManager() is not None and slicer.app.layoutManager().threeDViewCount > 0:
+            threeDView = slicer.app.layoutManager().threeDWidget(0).threeDView()
+
+        background = self.background
+        background2 = background
+        if background is None and threeDView is not None:
+            background = threeDView.mrmlViewNode().GetBackgroundColor()
+            background2 = threeDView.mrmlViewNode().GetBackgroundColor2()
+        if background is not None:
+            self.renderer.SetBackground(background)
+            self.renderer.SetBackground2(background2)
+            self.renderer.SetGradientBackground(tuple(background) != tuple(background2))
+
+        if camera and threeDView is not None:
+            self.camera.DeepCopy(threeDView.cameraNode().GetCamera())
+        elif reset_camera:
+            self.renderer.ResetCamera()
+        self.renderer.ResetCameraClippingRange()
+
+    def _actor(self, key, polyData, displayNode, transformNode):
+        """
+        Actor of a model or segment, created if needed, with the display properties and the linear parent transform.
+        """
+
+        import vtk
+
+        if key not in self.actors:
+            actor = vtk.vtkActor()
+            actor.SetMapper(vtk.vtkPolyDataMapper())
+            self.renderer.AddActor(actor)
+            self.actors[key] = actor
+        actor = self.actors[key]
+
+        if isinstance(polyData, vtk.vtkAlgorithmOutput):
+            actor.GetMapper().SetInputConnection(polyData)
+        else:
+            actor.GetMapper().SetInputData(polyData)
+
+        prop = actor.GetProperty()
+        prop.SetColor(displayNode.GetColor())
+        prop.SetOpacity(displayNode.GetOpacity())
+        prop.SetAmbient(displayNode.GetAmbient())
+        prop.SetDiffuse(displayNode.GetDiffuse())
+        prop.SetSpecular(displayNode.GetSpecular())
+        prop.SetSpecularPower(displayNode.GetPower())
+        prop.SetBackfaceCulling(displayNode.GetBackfaceCulling())
+        prop.SetRepresentation(displayNode.GetRepresentation())
+
+        matrix = vtk.vtkMatrix4x4()
+        if transformNode is not None and transformNode.IsTransformToWorldLinear():
+            transformNode.GetMatrixTransformToWorld(matrix)
+        actor.SetUserMatrix(matrix)
+
+        return actor
+
+    @staticmethod
+    def _set_scalars(mapper, displayNode):
+        import vtk
+
+        mapper.SetScalarVisibility(displayNode.GetScalarVisibility())
+        if displayNode.GetScalarVisibility():
+            mapper.SelectColorArray(displayNode.GetActiveScalarName())
+            if displayNode.GetActiveAttributeLocation() == vtk.vtkAssignAttribute.CELL_DATA:
+                mapper.SetScalarModeToUseCellFieldData()
+            else:
+                mapper.SetScalarModeToUsePointFieldData()
+            if displayNode.GetScalarRangeFlag() == displayNode.UseDirectMapping:
+                mapper.SetColorModeToDirectScalars()
+            else:
+                mapper.SetColorModeToMapScalars()
+                mapper.SetScalarRange(displayNode.GetScalarRange())
+                if displayNode.GetColorNode() is not None:
+                    mapper.SetLookupTable(displayNode.GetColorNode().GetScalarsToColors())
+                    mapper.UseLookupTableScalarRangeOff()
+
+    def render(self, out=None, bgr=False):
+        """
+        Render the scene and return it as an image.
+
+        Args:
+            out (numpy.ndarray): optional (height, width, 3) uint8 buffer receiving the image
+            bgr (bool): BGR channel order (OpenCV) instead of RGB. Default is False
+
+        Returns:
+            image (numpy.ndarray): (height, width, 3) uint8 image, top row first
+        """
+
+        width, height = self.resolution
+        if out is None:
+            out = np.empty((height, width, 3), dtype=np.uint8)
+
+        self.renderer.ResetCameraClippingRange()
+        self.render_window.Render()
+        self.capture.Modified()
+        self.capture.Update()
+
+        vtk_array = self.capture.GetOutput().GetPointData().GetScalars()
+        image = np.frombuffer(vtk_array, dtype=np.uint8).reshape(height * self.supersampling, width * self.supersampling, 3)
+
+        if self.supersampling > 1:
+            # Average each supersampling x supersampling block
+            ss = self.supersampling
+            image = image.reshape(height, ss, width, ss, 3).mean(axis=(1, 3)) + 0.5
+
+        # Flip (VTK bottom-left → top-left) and channel order in a single copy
+        np.copyto(out, image[::-1, :, ::-1] if bgr else image[::-1], casting='unsafe')
+
+        return out
+
+    def screenshot(self, outputfile):
+        """
+        Render the scene and save it as an image file (e.g. .png, .jpg, .tif).
+        """
+
+        import vtk
+        from vtk.util.numpy_support import numpy_to_vtk
+
+        image = self.render()
+        height, width, _ = image.shape
+
+        vtk_image = vtk.vtkImageData()
+        vtk_image.SetDimensions(width, height, 1)
+        vtk_image.GetPointData().SetScalars(numpy_to_vtk(image[::-1].reshape(-1, 3), deep=True))
+
+        writer = _image_writer(outputfile)
+        writer.SetInputData(vtk_image)
+        writer.Write()
+
+def _apply_camera_pose(camera, pose):
+    """
+    Set a camera pose dict on a camera node or a vtkCamera (they share the setters).
+    """
+
+    camera.SetPosition(pose['position'])
+    camera.SetFocalPoint(pose['focalPoint'])
+    camera.SetViewUp(pose['viewUp'])
+    if pose.get('viewAngle'):
+        camera.SetViewAngle(pose['viewAngle'])
+    if pose.get('parallelScale'):
+        camera.SetParallelScale(pose['parallelScale'])
+
+def _camera_poses(poses):
+    """
+    Normalize camera poses to a list of (name, pose dict) with 'position', 'focalPoint' and 'viewUp' vectors.
+
+    Accepts ```get_camera_3Dview()``` outputs (3 rows, as a list or DataFrame), flat pose dicts, CSV paths, or a list of those.
+    """
+
+    import csv
+    from pathlib import Path
+
+    def from_rows(rows):
+        pose = {key: [float(row[key]) for row in rows] for key in ('position', 'focalPoint', 'viewUp')}
+        for key in ('viewAngle', 'parallelScale'):
+            value = rows[0].get(key)
+            pose[key] = float(value) if value not in (None, '') and value == value else None
+        return pose
+
+    def parse(item, index):
+        if isinstance(item, (str, Path)):
+            with open(item, newline='') as f:
+                rows = list(csv.DictReader(f))
+            # Several poses may be concatenated, 3 rows (x, y, z) each
+            stem = Path(item).name.split('.')[0]
+            chunks = [rows[i:i + 3] for i in range(0, len(rows), 3)]
+            if len(chunks) == 1:
+                return [(stem, from_rows(chunks[0]))]
+            return [(f"{stem}_{i}", from_rows(chunk)) for i, chunk in enumerate(chunks)]
+        if hasattr(item, 'to_dict'):
+            return [(index, from_rows(item.to_dict('records')))]
+        if isinstance(item, dict):
+            return [(index, item)]
+        return [(index, from_rows(list(item)))]
+
+    # A single pose given directly
+    if isinstance(poses, (str, Path, dict)) or hasattr(poses, 'to_dict') or (
+            len(poses) == 3 and all(isinstance(row, dict) and 'position' in row and np.isscalar(row['position']) for row in poses)):
+        poses = [poses]
+
+    named_poses = []
+    for index, item in enumerate(poses):
+        named_poses.extend(parse(item, index))
+
+    return named_poses
+
+def _image_writer(outputfile):
+    """
+    VTK image writer matching the file extension.
+    """
+
+    import vtk
+
+    writers = {
+        '.bmp': vtk.vtkBMPWriter,
+        '.jpeg': vtk.vtkJPEGWriter,
+        '.jpg': vtk.vtkJPEGWriter,
+        '.png': vtk.vtkPNGWriter,
+        '.tif': vtk.vtkTIFFWriter,
+        '.tiff': vtk.vtkTIFFWriter,
+    }
+    extension = os.path.splitext(str(outputfile))[1].lower()
+    if extension not in writers:
+        raise ValueError(f"Unsupported image format '{extension}'. Choose among {list(writers)}")
+
+    writer = writers[extension]()
+    writer.SetFileName(str(outputfile))
+
+    return writer
+
+class _PipeVideoWriter:
+    """
+    Video writer streaming raw BGR frames through a pipe to an ffmpeg process.
+
+    The yuv420p output needs an even width and height, so an odd last row or column is cropped by ffmpeg.
+    Errors of the ffmpeg process are raised with its error output.
+    """
+
+    def __init__(self, output_video_path, fps, resolution, ffmpeg='ffmpeg', codec='libx264', crf=18):
+        import subprocess
+
+        command = [
+            ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f"{resolution[0]}x{resolution[1]}", '-r', str(fps), '-i', '-',
+        ]
+        if resolution[0] % 2 or resolution[1] % 2:
+            command += ['-vf', 'crop=trunc(iw/2)*2:trunc(ih/2)*2:0:0']
+        command += ['-c:v', codec, '-crf', str(crf), '-pix_fmt', 'yuv420p', str(output_video_path)]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.stderr = b''
+
+    def write(self, frame):
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except BrokenPipeError:
+            # ffmpeg exited early, report its error
+            self.release()
+            raise RuntimeError("ffmpeg exited before the end of the video")
+
+    def release(self):
+        if self.process.returncode is None:
+            _, self.stderr = self.process.communicate()
+        if self.process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {self.stderr.decode(errors='replace').strip()}")
+
+def _open_video_writer(output_video_path, fps, resolution, encoder='auto', codec='libx264', crf=18):
+    """
+    Video writer with ```write(frame)``` and ```release()```: ffmpeg through a pipe, or OpenCV as fallback.
+    """
+
+    import shutil
+
+    ffmpeg = shutil.which('ffmpeg') if encoder in ('auto', 'ffmpeg') else None
+    if encoder == 'ffmpeg' and ffmpeg is None:
+        raise RuntimeError("ffmpeg was not found on the PATH")
+    if encoder not in ('auto', 'ffmpeg', 'opencv'):
+        raise ValueError("encoder must be 'auto', 'ffmpeg' or 'opencv'")
+
+    if ffmpeg is not None:
+        return _PipeVideoWriter(output_video_path, fps, resolution, ffmpeg=ffmpeg, codec=codec, crf=crf)
+
+    import cv2
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    return cv2.VideoWriter(str(output_video_path), fourcc, fps, tuple(resolution))
+
+def _visible_3D(displayNode):
+    return displayNode is not None and displayNode.GetVisibility() and displayNode.GetVisibility3D()
+
+class _FrameConverter:
+    """
+    Converts captured VTK images (RGB, bottom-up) to BGR top-down frames of a given resolution in one pass.
+    With a resolution of None the frames keep the captured size.
+
+    The flip and resize are folded into one remapping, computed once per input size, so each frame is read once
+    and written into a caller-provided buffer.
+    """
+
+    def __init__(self, resolution):
+        self.resolution = tuple(resolution) if resolution is not None else None
+        self.input_size = None
+        self.maps = None
+
+    def __call__(self, vtk_image, out):
+        import cv2
+
+        width, height, _ = vtk_image.GetDimensions()
+        vtk_array = vtk_image.GetPointData().GetScalars()
+        image = np.frombuffer(vtk_array, dtype=np.uint8).reshape(height, width, vtk_array.GetNumberOfComponents())
+
+        if self.resolution is None or (width, height) == self.resolution:
+            # Flip and RGB → BGR in a single copy
+            np.copyto(out, image[::-1, :, 2::-1])
+            return out
+
+        if self.input_size != (width, height):
+            self.input_size = (width, height)
+            out_width, out_height = self.resolution
+            # Same sampling positions as cv2.resize, with the vertical flip (VTK bottom-left → OpenCV top-left)
+            map_x = (np.arange(out_width, dtype=np.float32) + 0.5) * (width / out_width) - 0.5
+            map_y = (height - 1) - ((np.arange(out_height, dtype=np.float32) + 0.5) * (height / out_height) - 0.5)
+            map_x, map_y = np.meshgrid(map_x, map_y)
+            self.maps = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+
+        cv2.remap(image[:, :, :3], self.maps[0], self.maps[1], cv2.INTER_LINEAR, dst=out, borderMode=cv2.BORDER_REPLICATE)
+        cv2.cvtColor(out, cv2.COLOR_RGB2BGR, dst=out)
+
+        return out
+
+class _FrameQueue:
+    """
+    Bounded queue of reusable frame buffers consumed by a writer thread.
+
+    At most ```size``` frames wait to be written and the buffers are recycled, so memory stays constant
+    however many frames are produced.
+    """
+
+    def __init__(self, write, shape, size=8):
+        import queue
+        import threading
+
+        self.write = write
+        self.error = None
+        self.free = queue.Queue()
+        for _ in range(size + 1):
+            self.free.put(np.empty(shape, dtype=np.uint8))
+        self.frames = queue.Queue(maxsize=size)
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                return
+            if self.error is None:
+                try:
+                    self.write(frame)
+                except Exception as error:
+                    self.error = error
+            self.free.put(frame)
+
+    def get_buffer(self):
+        if self.error is not None:
+            raise self.error
+        return self.free.get()
+
+    def put(self, frame):
+        self.frames.put(frame)
+
+    def close(self):
+        self.frames.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
@@ -1,11 +1,45 @@
 import slicer
 
+def auto_window_level(volumeNode, low=1, high=99, bins=4096, refine=True):
+    '''
+    Set the Window and Level of one or many volumes from the percentiles of their voxel intensities.
+
+    The percentiles are estimated with ```pyslicer.histogram.array_percentiles()```, which streams the voxels in slabs 
+    through a fixed-size histogram instead of sorting them as numpy.percentile does, 
+    so memory stays bounded and the error is at most (max - min) / bins**2 (exact for 8 and 16-bit volumes).
+
+    Args:
+        volumeNode (slicer.vtkMRMLVolumeNode or list): Volume Node, or list of Volume Nodes to process in a batch
+        low (float): lower percentile, mapped to the bottom of the window. Default 1.
+        high (float): upper percentile, mapped to the top of the window. Default 99.
+        bins (int): number of histogram bins of the percentile estimate. Default 4096.
+        refine (bool): extra pass over the voxels to refine the estimate. Default True.
+
+    Returns:
+        window_level (tuple): (window, level) of the volume, or list of (window, level) for a list of volumes
+    '''
+    from pyslicer.histogram import array_percentiles
+
+    if isinstance(volumeNode, (list, tuple)):
+        return [auto_window_level(node, low=low, high=high, bins=bins, refine=refine) for node in volumeNode]
+
+    volumeArray = slicer.util.arrayFromVolume(volumeNode)
+    low_value, high_value = array_percentiles(volumeArray, [low, high], bins=bins, refine=refine)
+
+    window = float(high_value - low_value)
+    level = float(high_value + low_value) / 2
+    set_window_level(window, level, volumeNode)
+
+    return window, level
    
-def plot_histogram(volumeNode, threshold=None, xlabel='Voxel Intensity', ylabel='Counts', yscale=None, xscale=None, bins=50, title=None):
+def plot_histogram(volumeNode, threshold=None, xlabel='Voxel Intensity', ylabel='Counts', yscale=None, xscale=None, bins=50, title=None, sample_size=None, sampling='strided'):
     '''
     Plotting voxel histogram using matplotlib.
     
     Script take from [SlicerNotebook tutorial](https://github.com/Slicer/SlicerNotebooks/blob/master/01_Data_loading_and_display.ipynb). 
+
+    The histogram comes from ```pyslicer.histogram.volume_histogram()```, cached until the volume is modified, 
+    so re-plotting with new threshold lines does not scan the voxels again.
     
     Args:
         volumeNode (slicer.vtkMRMLVolumeNode): Volume Node to plot
@@ -14,15 +48,14 @@ def plot_histogram(volumeNode, threshold=None, xlabel='Voxel Intensity', ylabel=
         ylabel (str): y-axis label of matplotlib plot. Default 'Counts'.
         yscale (str): Set the yaxis' scale {"linear", "log", "symlog", "logit", ...}.
         xscale (str): Set the xaxis' scale {"linear", "log", "symlog", "logit", ...}.
-        bins (int): it defines the number of equal-width bins in the given range (10, by default)
+        bins (int): it defines the number of equal-width bins in the given range (50, by default)
         title (str): title of matplotlib plot. Default None.
+        sample_size (int): target number of sampled voxels for huge volumes. Default None uses all voxels.
+        sampling (str): 'strided' or 'random' voxel sampling. Default 'strided'.
     '''
     import JupyterNotebooksLib as slicernb
-    import numpy as np
     import matplotlib.pyplot as plt
-    
-    # Extract all voxels of the volume as numpy array
-    volumeArray = slicer.util.arrayFromVolume(volumeNode)
+    from pyslicer.histogram import volume_histogram
     
     try:
       import matplotlib
@@ -32,8 +65,8 @@ def plot_histogram(volumeNode, threshold=None, xlabel='Voxel Intensity', ylabel=
 
     matplotlib.use('Agg')
 
-    # Get a volume from SampleData and compute its histogram
-    histogram = np.histogram(volumeArray, bins=50)
+    # Compute the histogram of the volume (or reuse the cached one)
+    histogram = volume_histogram(volumeNode, bins=bins, sample_size=sample_size, sampling=sampling)
 
     # Show a plot using matplotlib
     fig, ax = plt.subplots()